@@ -0,0 +1,67 @@
+"""
+Import-time budget for the simulator entry point. Spawned sweep workers and
+short CLI runs pay this before doing any work, so plotting and fitting
+dependencies must stay deferred.
+
+    python benchmarks/import_time.py [--module simulatorenv] [--budget 0.5]
+
+Exits with status 1 when the best of --repeat fresh interpreter imports is
+over budget, or when a deferred dependency gets imported eagerly again.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULES = ["pandas", "matplotlib", "networkx", "sklearn"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="simulatorenv")
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    best = min(run["seconds"] for run in runs)
+    loaded = sorted(set(m for run in runs for m in run["loaded"]))
+
+    print(
+        f"import {args.module}: best {best * 1000:.1f} ms of {args.repeat} "
+        f"(budget {args.budget * 1000:.0f} ms)"
+    )
+    failed = False
+    if best > args.budget:
+        print("FAIL: import time over budget")
+        failed = True
+    if loaded:
+        print(f"FAIL: deferred dependencies imported eagerly: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,21 @@
+import argparse
+import itertools
+import os
+import time
+from functools import partial
 import numpy as np
-import json
-from utils.Components import (
-    Water,
-    SO4_2m,
-    H_1p,
-    Mg,
-    Fe,
-    SiO2,
-    UO2SO4,
-    MN2_1p,
-    Al_3p,
-)
 from utils.Stream import Stream
-from models.IsothermModeling import IsothermModel
-from units.PLSMixer import PLSMixer
-from units.Extraction import Extraction
-from units.Stripping import Stripping
+from utils.SweepQueue import SweepQueue, parse_shard, shard_indices
+from utils.SweepRunner import (
+    SweepRunner,
+    grid_fingerprint,
+    grid_point,
+    grid_size,
+)
+from utils.SweepStore import SweepStore, run_id
+from sxcircuit import SXCircuit, sx_circuit
+
+UO2SO4_MASS_FLOW = Stream.accessor("UO2SO4", "mass_flow")
 
 BEST_REWARD = -np.inf
 BEST_PARAMS = {}
@@ -28,114 +28,23 @@ def SXSimulator(
     OA_strip: float,
     tentative_BO: float,
     tentative_DR: float,
+    kremser_tolerance: float = None,
 ):
-    global BEST_REWARD
-    global BEST_PARAMS
-
-    overflow = Stream(
-        stream_number=1,
-        origin="In",
-        destination="PLSMixer",
-        components=[
-            Water(1075.428),
-            H_1p(0.004993),
-            UO2SO4(16.60078),
-            SO4_2m(33.40968),
-            Fe(6.3524),
-            MN2_1p(1.063569),
-            Mg(3.262506),
-            SiO2(3.871035),
-            Al_3p(1.331062),
-        ],
-    )
-
-    pls_acid = Stream(
-        stream_number=2,
-        origin="In",
-        destination="PLSMixer",
-    )
-
-    acidic_pls = Stream(stream_number=3, origin="PLSMixer", destination="Extraction")
-
-    PLSMixer_unit = PLSMixer(
-        name="PLSMixer",
-        pls_stream=overflow,
-        acid_stream=pls_acid,
-        acidic_pls=acidic_pls,
-    )
-
-    loaded_organic = Stream(
-        stream_number=4,
-        origin="Extraction",
-        destination="Stripping",
-    )
-
-    barren_organic = Stream(
-        stream_number=5,
-        origin="Stripping",
-        destination="Extraction",
-    )
-
-    depleted_raffinate = Stream(
-        stream_number=6,
-        origin="Extraction",
-        destination="Out",
-    )
-
-    Extraction_unit = Extraction(
-        name="Extraction",
-        isotherm_model=IsothermModel(
-            data_path="data/UeqExtrationData.csv",
-            x_label="U(aq)",
-            y_label="U(org)",
-            change_intercept=False,
-            plot=False,
-        ),
-        pls=acidic_pls,
-        stripped_organic=barren_organic,
-        loaded_organic=loaded_organic,
-        depleted_raffinate=depleted_raffinate,
-        num_stages=num_stage_extract,
-        efficiency=0.95,
-        OA_ratio=OA_extract,
+    circuit = SXCircuit(
+        num_stage_extract=num_stage_extract,
+        num_stage_strip=num_stage_strip,
+        OA_extract=OA_extract,
+        OA_strip=OA_strip,
         tentative_BO=tentative_BO,
         tentative_DR=tentative_DR,
-        plot=False,
+        kremser_tolerance=kremser_tolerance,
     )
-
-    if Extraction_unit.error():
+    if circuit is None:
         return 0
 
-    dilute_acid = Stream(
-        stream_number=7,
-        origin="In",
-        destination="Stripping",
-    )
-
-    strip_liquor = Stream(stream_number=8, origin="Extraction", destination="Out")
-
-    Stripping_unit = Stripping(
-        name="Stripping",
-        isotherm_model=IsothermModel(
-            data_path="data/UeqStrippingData.csv",
-            x_label="U(org)",
-            y_label="U(aq)",
-            plot=False,
-        ),
-        loaded_organic=loaded_organic,
-        stripping_agent=dilute_acid,
-        stripped_organic=barren_organic,
-        strip_liquor=strip_liquor,
-        stripped_org_Uconc=Extraction_unit.stripped_org_Uconc,
-        loaded_org_Uconc=Extraction_unit.loaded_org_Uconc,
-        num_stages=num_stage_strip,
-        efficiency=0.95,
-        OA_ratio=OA_strip,
-        plot=False,
-    )
-
-    if Stripping_unit.error():
-        return 0
+    Extraction_unit = circuit.units["Extraction"]
+    Stripping_unit = circuit.units["Stripping"]
+    depleted_raffinate = circuit.streams[6]
 
     return_dict = {
         "params" : {
@@ -147,7 +56,7 @@ def SXSimulator(
             "tentative_DR" : tentative_DR,
         },
         "results" : {
-            "wasted_uranium" : depleted_raffinate.get_component_property("UO2SO4", "mass_flow"),
+            "wasted_uranium" : UO2SO4_MASS_FLOW(depleted_raffinate),
             "strip_liq_conc" : Stripping_unit.get_strip_concentration(),
             "extraction_per_stage" : Extraction_unit.extraction_per_stage(),
             "stripping_per_stage" : Stripping_unit.stripping_per_stage(),
@@ -157,37 +66,153 @@ def SXSimulator(
     return return_dict
 
 
-extraction_stages = [4]
-stripping_stages = [5]
-oa_extraction = list(np.linspace(1.2, 1.75, 7))
-oa_stripping = list(np.linspace(2.0, 3.5, 7))
-tentative_BO = list(np.linspace(0.005, 0.008, 7))
-tentative_DR = list(np.linspace(0.1, 0.8, 7))
-
-number_of_trials =  len(extraction_stages) * len(stripping_stages) * len(oa_extraction) * len(oa_stripping) * len(tentative_BO) * len(tentative_DR)
-print(number_of_trials)
-
-run = 1
-data = {}
-
-for extract_stage in extraction_stages:
-    for strip_stage in stripping_stages:
-        for oa_extract in oa_extraction:
-            for oa_strip in oa_stripping:
-                for bo in tentative_BO:
-                    for dr in tentative_DR:
-                        result = SXSimulator(
-                            num_stage_extract=extract_stage,
-                            num_stage_strip=strip_stage,
-                            OA_extract=oa_extract,
-                            OA_strip=oa_strip,
-                            tentative_BO=bo,
-                            tentative_DR=dr,
-                        )
-                        if isinstance(result, dict):
-                            data[run] = result.copy()
-                            if run % 100 == 0:
-                                print(f"{((run/number_of_trials) * 100):.2}% complete")
-                        run += 1
-with open('data_4_5.json', 'w') as fp:
-    json.dump(data, fp)
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="Brute force sweep of the SX circuit")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="worker processes, 1 runs serially"
+    )
+    parser.add_argument(
+        "--backend", choices=SweepRunner.BACKENDS, default="process"
+    )
+    parser.add_argument(
+        "--output",
+        help="results streamed as JSON lines, data_4_5.jsonl unless sharded. "
+        "With --queue the merged results, by default in the queue directory",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="keep --output and skip its runs"
+    )
+    parser.add_argument(
+        "--export",
+        help="feasible results as one JSON object once done, empty to skip. "
+        "data_4_5.json, in the queue directory with --queue",
+    )
+    parser.add_argument(
+        "--shard", help="i/N, only run every N-th point starting at the i-th"
+    )
+    parser.add_argument(
+        "--queue", help="directory shared by workers claiming chunks of the grid"
+    )
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument(
+        "--kremser-tolerance",
+        type=float,
+        help="solve the stages in closed form where the isotherm is within this "
+        "of a line, feasibility may then differ from stepping near the limits",
+    )
+    parser.add_argument(
+        "--stale-after",
+        type=float,
+        help="seconds after which a queue chunk left unfinished is claimed again",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="RESULTS",
+        help="merge shard or queue results files into --output and --export",
+    )
+    args = parser.parse_args()
+
+    axes = {
+        "num_stage_extract": [4],
+        "num_stage_strip": [5],
+        "OA_extract": list(np.linspace(1.2, 1.75, 7)),
+        "OA_strip": list(np.linspace(2.0, 3.5, 7)),
+        "tentative_BO": list(np.linspace(0.005, 0.008, 7)),
+        "tentative_DR": list(np.linspace(0.1, 0.8, 7)),
+    }
+    number_of_trials = grid_size(**axes)
+    print(number_of_trials)
+
+    if args.merge:
+        output = args.output or "data_4_5.jsonl"
+        missing = SweepStore.merge(args.merge, output, number_of_trials)
+        print(f"merged {len(args.merge)} files, {missing} runs missing")
+        export = "data_4_5.json" if args.export is None else args.export
+        if export:
+            SweepStore.export([output], export, number_of_trials)
+        return
+
+    queue = None
+    if args.queue:
+        if args.shard:
+            parser.error("--shard and --queue are exclusive")
+        queue = SweepQueue(
+            args.queue,
+            number_of_trials,
+            chunk_size=args.chunk_size,
+            stale_after=args.stale_after,
+            # workers with another tolerance would give different results
+            grid=grid_fingerprint(
+                **axes,
+                **(
+                    {}
+                    if args.kremser_tolerance is None
+                    else {"kremser_tolerance": [args.kremser_tolerance]}
+                ),
+            ),
+        )
+        # --output is then the merged file, each worker writes its own
+        output = queue.output
+        export = (
+            os.path.join(queue.directory, "data_4_5.json")
+            if args.export is None
+            else args.export
+        )
+    elif args.shard:
+        shard, shards = parse_shard(args.shard)
+        output = args.output or f"data_4_5.shard-{shard}-of-{shards}.jsonl"
+    else:
+        output = args.output or "data_4_5.jsonl"
+        export = "data_4_5.json" if args.export is None else args.export
+
+    print(f"template compiled in {sx_circuit().compile_seconds:.4f}s")
+
+    simulator = SXSimulator
+    if args.kremser_tolerance is not None:
+        simulator = partial(SXSimulator, kremser_tolerance=args.kremser_tolerance)
+    runner = SweepRunner(simulator, workers=args.workers, backend=args.backend)
+    start = time.perf_counter()
+    with SweepStore(output, number_of_trials, resume=args.resume) as store:
+        if queue is not None:
+            indices = queue.indices()
+        else:
+            # copied, as the store marks runs done while the indices are read
+            done = store.completed().copy()
+            if args.resume:
+                print(f"{int(done.sum())} runs already done")
+            if args.shard:
+                mask = np.zeros(number_of_trials, dtype=bool)
+                mask[shard_indices(number_of_trials, shard, shards)] = True
+                done |= ~mask
+            indices = (int(index) for index in np.flatnonzero(~done))
+        indices, point_indices = itertools.tee(indices)
+        points = (grid_point(index, **axes) for index in point_indices)
+        for index, result in zip(indices, runner.imap(points)):
+            run = run_id(index)
+            store.append(run, result)
+            if isinstance(result, dict) and run % 100 == 0:
+                print(f"{((run/number_of_trials) * 100):.2}% complete")
+            if queue is not None and queue.is_chunk_end(index):
+                store.flush()
+                queue.complete(queue.chunk_of(index))
+    print(f"evaluated in {time.perf_counter() - start:.2f}s")
+
+    if queue is not None:
+        remaining = queue.remaining()
+        if remaining or not queue.claim_merge():
+            print(f"{remaining} chunks still running elsewhere, the last worker merges")
+            return
+        # the winner may be on any host, so merge into the shared directory
+        output = args.output or os.path.join(queue.directory, "data_4_5.jsonl")
+        SweepStore.merge(queue.result_files(), output, number_of_trials)
+        print(f"merged into {output}")
+    elif args.shard:
+        print(f"shard {shard}/{shards} done, merge the shards with --merge")
+        return
+    if export:
+        SweepStore.export([output], export, number_of_trials)
+
+
+if __name__ == "__main__":
+    main()
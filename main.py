@@ -10,75 +10,73 @@ from utils.Components import (
     Al_3p,
 )
 from utils.Stream import Stream
-from models.IsothermModeling import IsothermModel
+from utils.Flowsheet import Flowsheet, UnitRef
+from models.IsothermModeling import (
+    IsothermModel,
+    EXTRACTION_ISOTHERM,
+    STRIPPING_ISOTHERM,
+)
 from units.PLSMixer import PLSMixer
 from units.Extraction import Extraction
 from units.Stripping import Stripping
 
 if __name__ == "__main__":
-    overflow = Stream(
-        stream_number=1,
-        origin="In",
-        destination="PLSMixer",
-        components=[
-            Water(1075.428),
-            H_1p(0.004993),
-            UO2SO4(16.60078),
-            SO4_2m(33.40968),
-            Fe(6.3524),
-            MN2_1p(1.063569),
-            Mg(3.262506),
-            SiO2(3.871035),
-            Al_3p(1.331062),
-        ],
+    flowsheet = Flowsheet()
+    overflow = flowsheet.add_stream(
+        Stream(
+            stream_number=1,
+            origin="In",
+            destination="PLSMixer",
+            components=[
+                Water(1075.428),
+                H_1p(0.004993),
+                UO2SO4(16.60078),
+                SO4_2m(33.40968),
+                Fe(6.3524),
+                MN2_1p(1.063569),
+                Mg(3.262506),
+                SiO2(3.871035),
+                Al_3p(1.331062),
+            ],
+        )
     )
-
-    pls_acid = Stream(
-        stream_number=2,
-        origin="In",
-        destination="PLSMixer",
+    pls_acid = flowsheet.add_stream(
+        Stream(stream_number=2, origin="In", destination="PLSMixer")
     )
-
-    acidic_pls = Stream(stream_number=3, origin="PLSMixer", destination="Extraction")
-
-    PLSMixer_unit = PLSMixer(
-        name="PLSMixer",
-        pls_stream=overflow,
-        acid_stream=pls_acid,
-        acidic_pls=acidic_pls,
+    acidic_pls = flowsheet.add_stream(
+        Stream(stream_number=3, origin="PLSMixer", destination="Extraction")
     )
-
-    loaded_organic = Stream(
-        stream_number=4,
-        origin="Extraction",
-        destination="Stripping",
+    loaded_organic = flowsheet.add_stream(
+        Stream(stream_number=4, origin="Extraction", destination="Stripping")
     )
-
-    barren_organic = Stream(
-        stream_number=5,
-        origin="Stripping",
-        destination="Extraction",
+    barren_organic = flowsheet.add_stream(
+        Stream(stream_number=5, origin="Stripping", destination="Extraction")
     )
-
-    depleted_raffinate = Stream(
-        stream_number=6,
-        origin="Extraction",
-        destination="Out",
+    depleted_raffinate = flowsheet.add_stream(
+        Stream(stream_number=6, origin="Extraction", destination="Out")
+    )
+    dilute_acid = flowsheet.add_stream(
+        Stream(stream_number=7, origin="In", destination="Stripping")
+    )
+    strip_liquor = flowsheet.add_stream(
+        Stream(stream_number=8, origin="Extraction", destination="Out")
     )
 
-    Extraction_unit = Extraction(
-        name="Extraction",
-        isotherm_model=IsothermModel(
-            data_path="data/UeqExtrationData.csv",
-            x_label="U(aq)",
-            y_label="U(org)",
-            change_intercept=False,
-            plot=False,
-        ),
-        pls=acidic_pls,
-        stripped_organic=barren_organic,
-        loaded_organic=loaded_organic,
-        depleted_raffinate=depleted_raffinate,
+    flowsheet.add_unit(
+        "PLSMixer",
+        PLSMixer,
+        {"pls_stream": 1, "acid_stream": 2, "acidic_pls": 3},
+    )
+    flowsheet.add_unit(
+        "Extraction",
+        Extraction,
+        {
+            "pls": 3,
+            "stripped_organic": 5,
+            "loaded_organic": 4,
+            "depleted_raffinate": 6,
+        },
+        isotherm_model=IsothermModel.get(**EXTRACTION_ISOTHERM),
         num_stages=4,
         efficiency=0.95,
         OA_ratio=1.625,
@@ -86,34 +84,27 @@ if __name__ == "__main__":
         tentative_DR=0.0558,
         plot=False,
     )
-
-    dilute_acid = Stream(
-        stream_number=7,
-        origin="In",
-        destination="Stripping",
-    )
-
-    strip_liquor = Stream(stream_number=8, origin="Extraction", destination="Out")
-
-    Stripping_unit = Stripping(
-        name="Stripping",
-        isotherm_model=IsothermModel(
-            data_path="data/UeqStrippingData.csv",
-            x_label="U(org)",
-            y_label="U(aq)",
-            plot=False,
-        ),
-        loaded_organic=loaded_organic,
-        stripping_agent=dilute_acid,
-        stripped_organic=barren_organic,
-        strip_liquor=strip_liquor,
-        stripped_org_Uconc=Extraction_unit.stripped_org_Uconc,
-        loaded_org_Uconc=Extraction_unit.loaded_org_Uconc,
+    flowsheet.add_unit(
+        "Stripping",
+        Stripping,
+        {
+            "loaded_organic": 4,
+            "stripping_agent": 7,
+            "stripped_organic": 5,
+            "strip_liquor": 8,
+        },
+        isotherm_model=IsothermModel.get(**STRIPPING_ISOTHERM),
+        stripped_org_Uconc=UnitRef("Extraction", "stripped_org_Uconc"),
+        loaded_org_Uconc=UnitRef("Extraction", "loaded_org_Uconc"),
         num_stages=5,
         OA_ratio=2.72,
         efficiency=0.95,
         plot=False,
     )
+    flowsheet.run()
+    PLSMixer_unit = flowsheet.units["PLSMixer"]
+    Extraction_unit = flowsheet.units["Extraction"]
+    Stripping_unit = flowsheet.units["Stripping"]
 
     print(f"overflow volume : {loaded_organic.total_mass/loaded_organic.total_volume}")
     print(overflow)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), ".cache", "isotherms"
+)
+
+
+class IsothermCache:
+    """
+    Content addressed store of fitted isotherms. An entry is keyed by the bytes
+    of the equilibrium CSV and every fitting option, so editing the data file
+    simply misses the cache. Entries are small JSON files:
+    {"best_degree": int, "mse_scores": {degree: mse}, "coefs": [c0, c1, ...],
+     "x_range": [min x, max x]}
+    """
+
+    # bump when the fitting procedure changes so stale fits are not reused
+    FIT_VERSION = 4
+
+    FIELDS = ("best_degree", "mse_scores", "coefs", "x_range")
+
+    def __init__(self, directory: str = None) -> None:
+        """directory defaults to $ISOTHERM_CACHE_DIR, else DEFAULT_CACHE_DIR"""
+        if directory is None:
+            directory = os.environ.get("ISOTHERM_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.directory = directory
+
+    @staticmethod
+    def key(
+        data: bytes,
+        x_label: str,
+        y_label: str,
+        min_degree: int,
+        max_degree: int,
+        change_intercept: bool,
+    ) -> str:
+        digest = hashlib.sha256(data)
+        options = json.dumps(
+            [
+                IsothermCache.FIT_VERSION,
+                x_label,
+                y_label,
+                min_degree,
+                max_degree,
+                change_intercept,
+            ]
+        )
+        digest.update(options.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Dict]:
+        """The entry, None on a miss, also for an unreadable or incomplete one"""
+        try:
+            with open(self.path(key), "r") as fp:
+                entry = json.load(fp)
+            entry = {field: entry[field] for field in IsothermCache.FIELDS}
+            entry["mse_scores"] = {
+                int(degree): score for degree, score in entry["mse_scores"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return entry
+
+    def store(self, key: str, entry: Dict) -> None:
+        """Atomic write so concurrent processes never read a partial entry"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as fp:
+                json.dump(entry, fp)
+            os.replace(tmp_path, self.path(key))
+        except OSError:
+            # a read-only checkout still works, it just refits every time
+            pass
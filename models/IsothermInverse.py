@@ -0,0 +1,239 @@
+import bisect
+from typing import List, Tuple
+
+import numpy as np
+from numpy.polynomial import Polynomial
+
+
+def monotone_segments(
+    poly: Polynomial, lower: float, upper: float
+) -> List[Tuple[float, float]]:
+    """
+    Split [lower, upper] at the real critical points of poly, so that poly is
+    strictly monotone on every returned (start, end) piece
+    """
+    breaks = [lower]
+    if poly.degree() > 1:
+        for root in np.sort(poly.deriv().roots()):
+            if abs(root.imag) <= 1e-12 and lower < root.real < upper:
+                breaks.append(float(root.real))
+    breaks.append(upper)
+    return list(zip(breaks[:-1], breaks[1:]))
+
+
+def horner(coefs: List[float], x: float) -> Tuple[float, float]:
+    """poly(x) and poly'(x) of increasing power coefficients, on python floats"""
+    value = 0.0
+    slope = 0.0
+    for c in reversed(coefs):
+        slope = slope * x + value
+        value = value * x + c
+    return value, slope
+
+
+class IsothermInverse:
+    """
+    Precomputed inverse of an isotherm polynomial on [lower, upper].
+
+    The range is cut into monotone segments, each tabulated on a dense grid.
+    root(y, limit) returns the largest x <= limit with poly(x) = y, the same root
+    McCabeThiele picks from Polynomial.roots(), by an O(log n) table search,
+    a linear interpolation and a Newton polish. Results agree with the eigenvalue
+    solve to within TOLERANCE in x. nan means the lookup cannot decide (limit
+    beyond the table, or no crossing inside it, e.g. a root below lower or a
+    tangent root) and the caller should fall back to the full root solve.
+    """
+
+    TOLERANCE = 1e-10
+
+    def __init__(
+        self, poly: Polynomial, lower: float, upper: float, resolution: int = 1024
+    ) -> None:
+        if not lower < upper:
+            raise ValueError("IsothermInverse needs lower < upper")
+        self.poly = poly
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.__coefs = [float(c) for c in poly.coef]
+        self.__deriv = poly.deriv()
+
+        # per segment: start, end, x table, y table sorted ascending, increasing?
+        self.__segments = []
+        for start, end in monotone_segments(poly, self.lower, self.upper):
+            x_table = np.linspace(start, end, resolution)
+            y_table = poly(x_table)
+            increasing = bool(y_table[-1] >= y_table[0])
+            if not increasing:
+                x_table, y_table = x_table[::-1], y_table[::-1]
+            self.__segments.append(
+                (start, end, x_table.tolist(), y_table.tolist(), increasing)
+            )
+
+    def root(self, y: float, limit: float) -> float:
+        """Largest root of poly(x) = y with x <= limit, nan if undecidable"""
+        if limit > self.upper:
+            return np.nan
+        for start, end, x_table, y_table, increasing in reversed(self.__segments):
+            if start > limit:
+                continue
+            if end > limit:
+                # only the part of the segment below limit counts
+                y_end, _ = horner(self.__coefs, limit)
+                if increasing and not y_table[0] <= y <= y_end:
+                    continue
+                if not increasing and not y_end <= y <= y_table[-1]:
+                    continue
+            elif not y_table[0] <= y <= y_table[-1]:
+                continue
+            return self.__polish(y, x_table, y_table, start, min(end, limit))
+        return np.nan
+
+    def __polish(self, y, x_table, y_table, start, end) -> float:
+        i = bisect.bisect_left(y_table, y)
+        i = min(max(i, 1), len(y_table) - 1)
+        y0, y1 = y_table[i - 1], y_table[i]
+        x0, x1 = x_table[i - 1], x_table[i]
+        x = x0 if y1 == y0 else x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        lo, hi = min(x0, x1), max(x0, x1)
+        for _ in range(8):
+            value, slope = horner(self.__coefs, x)
+            if slope == 0:
+                break
+            step = (value - y) / slope
+            x = min(max(x - step, lo), hi)
+            if abs(step) <= 1e-15 * (1 + abs(x)):
+                break
+        return min(max(x, start), end)
+
+    def __call__(self, y: np.ndarray, limit: np.ndarray) -> np.ndarray:
+        """Vectorized root over arrays of y and limit"""
+        y, limit = np.broadcast_arrays(
+            np.asarray(y, dtype=float), np.asarray(limit, dtype=float)
+        )
+        out = np.full(y.shape, np.nan)
+        undecided = limit <= self.upper
+        for start, end, x_table, y_table, increasing in reversed(self.__segments):
+            rows = np.flatnonzero(undecided & (limit >= start))
+            if len(rows) == 0:
+                continue
+            x_table, y_table = np.asarray(x_table), np.asarray(y_table)
+            seg_end = np.minimum(end, limit[rows])
+            y_end = self.poly(seg_end)
+            y_start = self.poly(np.full(len(rows), start))
+            y_lo, y_hi = np.minimum(y_start, y_end), np.maximum(y_start, y_end)
+            hit = (y[rows] >= y_lo) & (y[rows] <= y_hi)
+            rows, seg_end = rows[hit], seg_end[hit]
+            if len(rows) == 0:
+                continue
+
+            i = np.clip(np.searchsorted(y_table, y[rows]), 1, len(y_table) - 1)
+            y0, y1 = y_table[i - 1], y_table[i]
+            x0, x1 = x_table[i - 1], x_table[i]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = np.where(y1 == y0, x0, x0 + (y[rows] - y0) * (x1 - x0) / (y1 - y0))
+            lo, hi = np.minimum(x0, x1), np.maximum(x0, x1)
+            for _ in range(8):
+                slope = self.__deriv(x)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    step = np.where(slope != 0, (self.poly(x) - y[rows]) / slope, 0.0)
+                x = np.clip(x - step, lo, hi)
+                if np.all(np.abs(step) <= 1e-15 * (1 + np.abs(x))):
+                    break
+            out[rows] = np.clip(x, start, seg_end)
+            undecided[rows] = False
+        return out
+
+
+class NewtonRootSolver:
+    """
+    Warm-started, safeguarded Newton/bisection solve of poly(x) = y for the
+    largest root x <= limit, the root McCabeThiele picks from Polynomial.roots().
+
+    The range [lower, upper] is split into monotone segments, so the segment
+    nearest below limit whose end values straddle y brackets exactly that root.
+    Newton starts from the root last returned for the same key (e.g. the same
+    stage of the previous design) or else the previous call's root, and falls
+    back to bisection whenever a step leaves the bracket. root returns nan
+    when no bracket exists in the range so the caller can fall back to the
+    eigenvalue solve. calls, iterations and fallbacks count the work done.
+    """
+
+    MAX_ITERATIONS = 60
+
+    def __init__(self, poly: Polynomial, lower: float, upper: float) -> None:
+        if not lower < upper:
+            raise ValueError("NewtonRootSolver needs lower < upper")
+        self.poly = poly
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.__coefs = [float(c) for c in poly.coef]
+        self.__segments = [
+            (start, end, horner(self.__coefs, start)[0])
+            for start, end in monotone_segments(poly, self.lower, self.upper)
+        ]
+        self.__warm_starts = {}
+        self.__last = None
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.calls = 0
+        self.iterations = 0
+        self.fallbacks = 0
+
+    @property
+    def mean_iterations(self) -> float:
+        solved = self.calls - self.fallbacks
+        return self.iterations / solved if solved else 0.0
+
+    def __bracket(self, y: float, limit: float):
+        for start, end, value_start in reversed(self.__segments):
+            if start > limit:
+                continue
+            hi = end if end <= limit else limit
+            f_hi = horner(self.__coefs, hi)[0] - y
+            f_lo = value_start - y
+            if f_hi == 0 or f_lo * f_hi <= 0:
+                return start, hi, f_lo, f_hi
+        return None
+
+    def root(self, y: float, limit: float, key=None) -> float:
+        self.calls += 1
+        bracket = self.__bracket(y, limit) if limit <= self.upper else None
+        if bracket is None:
+            self.fallbacks += 1
+            return np.nan
+        a, b, f_a, f_b = bracket
+        if f_b == 0:
+            return self.__remember(key, b)
+        if f_a == 0:
+            return self.__remember(key, a)
+
+        x = self.__warm_starts.get(key, self.__last)
+        if x is None or not a < x < b:
+            # secant point of the bracket
+            x = a - f_a * (b - a) / (f_b - f_a)
+
+        for _ in range(NewtonRootSolver.MAX_ITERATIONS):
+            self.iterations += 1
+            f_x, slope = horner(self.__coefs, x)
+            f_x -= y
+            if f_x == 0:
+                break
+            if (f_x < 0) == (f_a < 0):
+                a, f_a = x, f_x
+            else:
+                b, f_b = x, f_x
+            x_new = x - f_x / slope if slope != 0 else a
+            if not a < x_new < b:
+                x_new = 0.5 * (a + b)
+            converged = abs(x_new - x) <= 1e-15 * (1 + abs(x))
+            x = x_new
+            if converged or b - a <= 1e-15 * (1 + abs(x)):
+                break
+        return self.__remember(key, x)
+
+    def __remember(self, key, x: float) -> float:
+        self.__last = x
+        if key is not None:
+            self.__warm_starts[key] = x
+        return x
@@ -1,14 +1,18 @@
-import numpy as np
+import io
+import os
+from typing import Dict, List, Tuple, Union
+
 from numpy.polynomial import Polynomial
-import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.model_selection import LeaveOneOut, cross_val_score
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
+
+from models.IsothermCache import IsothermCache
+from models.IsothermInverse import IsothermInverse, NewtonRootSolver
+from models.PolynomialFit import fit_polynomial, loo_mse
 
 
 class IsothermModel:
+    # shared, read-only models handed out by IsothermModel.get
+    _SHARED: Dict[Tuple, "IsothermModel"] = {}
+
     def __init__(
         self,
         data_path: str,
@@ -18,40 +22,177 @@ class IsothermModel:
         max_degree=5,
         plot: bool = False,
         change_intercept: bool = True,
+        cache: Union[IsothermCache, bool] = None,
     ):
-        self.__equilibrium_dataframe = pd.read_csv(data_path)
+        """
+        cache=None uses an IsothermCache in the default directory, created per
+        call, cache=False always refits
+        """
+        with open(data_path, "rb") as fp:
+            self.__raw_data = fp.read()
         self.x_label = x_label
         self.y_label = y_label
         self.__intercept = change_intercept
-        # sk learn expects 2D tensor of shape (Features, Samples)
-        self.__X = self.__equilibrium_dataframe[[self.x_label]].values
-        self.__Y = self.__equilibrium_dataframe[self.y_label].values
 
         self.__min_poly_degree = min_degree
         self.__max_poly_degree = max_degree
 
-        self.__mse_scores = {}
-        self.__best_degree = self.__find_best_degree()
-        self.characteristic_poly = self.__train_and_convert_to_numpy_poly()
+        cache_key = IsothermCache.key(
+            self.__raw_data,
+            x_label,
+            y_label,
+            min_degree,
+            max_degree,
+            change_intercept,
+        )
+        if cache is None:
+            cache = IsothermCache()
+        entry = cache.load(cache_key) if cache is not False else None
+        self.frozen = False
+        self.__inverses = {}
+        self.__newton_solvers = {}
+        self.from_cache = entry is not None
+        if self.from_cache:
+            self.__mse_scores = entry["mse_scores"]
+            self.__best_degree = entry["best_degree"]
+            self.x_range = tuple(entry["x_range"])
+            self.characteristic_poly = Polynomial(entry["coefs"])
+        else:
+            self.__load_dataset()
+            self.__mse_scores = {}
+            self.__best_degree = self.__find_best_degree()
+            self.characteristic_poly = self.__train_and_convert_to_numpy_poly()
+            self.x_range = (float(self.__X.min()), float(self.__X.max()))
+            if cache is not False:
+                cache.store(
+                    cache_key,
+                    {
+                        "best_degree": self.__best_degree,
+                        "mse_scores": self.__mse_scores,
+                        "coefs": self.characteristic_poly.coef.tolist(),
+                        "x_range": list(self.x_range),
+                    },
+                )
 
         if plot:
+            if self.from_cache:
+                self.__load_dataset()
             self.__plot_mse_vs_degree()
             self.__plot_predictions()
 
-    def __fit_poly_to_dataset(self, n):
-        model = make_pipeline(
-            PolynomialFeatures(n, include_bias=self.__intercept),
-            LinearRegression(fit_intercept=False),
-        )
-        scores = cross_val_score(
-            model,
-            self.__X,
-            self.__Y,
-            cv=LeaveOneOut(),
-            scoring="neg_mean_squared_error",
+    @classmethod
+    def get(
+        cls,
+        data_path: str,
+        x_label: str,
+        y_label: str,
+        min_degree=2,
+        max_degree=5,
+        change_intercept: bool = True,
+    ) -> "IsothermModel":
+        """
+        Process-wide shared model for these fitting options. The first call fits
+        (or loads from the disk cache), later calls return the same frozen
+        instance. The key includes the file's size and mtime, so an edited
+        data file gets refitted.
+        """
+        stat = os.stat(data_path)
+        key = (
+            os.path.abspath(data_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            x_label,
+            y_label,
+            min_degree,
+            max_degree,
+            change_intercept,
         )
-        # remove last element
-        return -np.mean(scores)  # returns MSE
+        model = cls._SHARED.get(key)
+        if model is None:
+            model = cls(
+                data_path,
+                x_label,
+                y_label,
+                min_degree=min_degree,
+                max_degree=max_degree,
+                change_intercept=change_intercept,
+            )
+            model.freeze()
+            cls._SHARED[key] = model
+        return model
+
+    @classmethod
+    def preload(cls, specs: List[Dict]) -> None:
+        """Warm the shared models, e.g. from a process pool initializer"""
+        for spec in specs:
+            cls.get(**spec)
+
+    def freeze(self) -> None:
+        """
+        Make the fitted polynomial read-only and precompute the objects stage
+        calculations derive from it
+        """
+        self.characteristic_poly.coef.flags.writeable = False
+        self.derivative_poly = self.characteristic_poly.deriv()
+        self.derivative_poly.coef.flags.writeable = False
+        self.frozen = True
+
+    def inverse(
+        self, lower: float = None, upper: float = None, resolution: int = 1024
+    ) -> IsothermInverse:
+        """
+        Cached inverse of characteristic_poly, by default over the range of the
+        equilibrium data widened by half its span on both sides, since stage
+        roots near the bottom of a staircase can fall below the data
+        """
+        span = self.x_range[1] - self.x_range[0]
+        lower = self.x_range[0] - 0.5 * span if lower is None else lower
+        upper = self.x_range[1] + 0.5 * span if upper is None else upper
+        key = (lower, upper, resolution)
+        inverse = self.__inverses.get(key)
+        if inverse is None:
+            inverse = IsothermInverse(
+                self.characteristic_poly, lower, upper, resolution
+            )
+            self.__inverses[key] = inverse
+        return inverse
+
+    def newton_solver(
+        self, lower: float = None, upper: float = None
+    ) -> NewtonRootSolver:
+        """
+        Cached warm-started Newton solver of characteristic_poly, over the same
+        default range as inverse(). Being shared per model, its warm starts carry
+        over from one design to the next.
+        """
+        span = self.x_range[1] - self.x_range[0]
+        lower = self.x_range[0] - 0.5 * span if lower is None else lower
+        upper = self.x_range[1] + 0.5 * span if upper is None else upper
+        solver = self.__newton_solvers.get((lower, upper))
+        if solver is None:
+            solver = NewtonRootSolver(self.characteristic_poly, lower, upper)
+            self.__newton_solvers[(lower, upper)] = solver
+        return solver
+
+    def __load_dataset(self):
+        # pandas is only needed on a cache miss or for plotting
+        import pandas as pd
+
+        self.__equilibrium_dataframe = pd.read_csv(io.BytesIO(self.__raw_data))
+        self.__X = self.__equilibrium_dataframe[self.x_label].values
+        self.__Y = self.__equilibrium_dataframe[self.y_label].values
+
+    @property
+    def best_degree(self) -> int:
+        return self.__best_degree
+
+    @property
+    def mse_scores(self):
+        return dict(self.__mse_scores)
+
+    def __fit_poly_to_dataset(self, n):
+        # exact leave-one-out MSE from a single least squares fit
+        return loo_mse(self.__X, self.__Y, n, include_bias=self.__intercept)
 
     def __find_best_degree(self):
         best_score = float("inf")
@@ -68,6 +209,8 @@ class IsothermModel:
         return best_degree
 
     def __plot_mse_vs_degree(self):
+        import matplotlib.pyplot as plt
+
         degrees = list(self.__mse_scores.keys())
         scores = list(self.__mse_scores.values())
 
@@ -84,12 +227,10 @@ class IsothermModel:
         plt.show()
 
     def __plot_for_degree(self, ax, degree):
-        model = make_pipeline(
-            PolynomialFeatures(degree, include_bias=self.__intercept),
-            LinearRegression(fit_intercept=False),
+        coefs = fit_polynomial(
+            self.__X, self.__Y, degree, include_bias=self.__intercept
         )
-        model.fit(self.__X, self.__Y)
-        y_pred = model.predict(self.__X)
+        y_pred = Polynomial(coefs)(self.__X)
 
         ax.scatter(self.__X, self.__Y, alpha=0.7, label="Actual")
         ax.scatter(self.__X, y_pred, alpha=0.7, label="Predicted")
@@ -99,6 +240,8 @@ class IsothermModel:
         ax.legend()
 
     def __plot_predictions(self):
+        import matplotlib.pyplot as plt
+
         num_plots = self.__max_poly_degree - self.__min_poly_degree + 1
         n_rows = num_plots // 2 + num_plots % 2
         n_cols = 2 if self.__max_poly_degree - self.__min_poly_degree + 1 > 1 else 1
@@ -114,13 +257,26 @@ class IsothermModel:
         plt.show()
 
     def __train_and_convert_to_numpy_poly(self):
-        best_model = make_pipeline(
-            PolynomialFeatures(self.__best_degree, include_bias=self.__intercept),
-            LinearRegression(fit_intercept=False),
+        coefs = fit_polynomial(
+            self.__X, self.__Y, self.__best_degree, include_bias=self.__intercept
         )
-        best_model.fit(self.__X, self.__Y)
-        coefs = best_model.named_steps["linearregression"].coef_
-        if not self.__intercept:
-            coefs = np.concatenate([[0], coefs])
         self.characteristic_poly = Polynomial(coefs)
         return self.characteristic_poly
+
+
+# equilibrium data of the SX circuit, for IsothermModel.get / preload, found
+# from this file so the models load from any working directory
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"
+)
+EXTRACTION_ISOTHERM = {
+    "data_path": os.path.join(DATA_DIR, "UeqExtrationData.csv"),
+    "x_label": "U(aq)",
+    "y_label": "U(org)",
+    "change_intercept": False,
+}
+STRIPPING_ISOTHERM = {
+    "data_path": os.path.join(DATA_DIR, "UeqStrippingData.csv"),
+    "x_label": "U(org)",
+    "y_label": "U(aq)",
+}
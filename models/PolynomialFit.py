@@ -0,0 +1,60 @@
+import numpy as np
+
+# scikit-learn's LinearRegression passes its tol as the relative singular value
+# cutoff of the dense lstsq, kept so the fits and scores match its pipeline
+RCOND = 1e-6
+
+
+def design_matrix(x: np.ndarray, degree: int, include_bias: bool) -> np.ndarray:
+    """Vandermonde columns x^0..x^degree, without x^0 if include_bias is False"""
+    x = np.asarray(x, dtype=float).ravel()
+    return np.vander(x, degree + 1, increasing=True)[:, 0 if include_bias else 1 :]
+
+
+def fit_polynomial(
+    x: np.ndarray, y: np.ndarray, degree: int, include_bias: bool = True
+) -> np.ndarray:
+    """Least squares coefficients in increasing power order (c0 = 0 without bias)"""
+    V = design_matrix(x, degree, include_bias)
+    coefs, *_ = np.linalg.lstsq(V, np.asarray(y, dtype=float).ravel(), rcond=RCOND)
+    if not include_bias:
+        coefs = np.concatenate([[0.0], coefs])
+    return coefs
+
+
+def loo_mse(
+    x: np.ndarray, y: np.ndarray, degree: int, include_bias: bool = True
+) -> float:
+    """
+    Leave-one-out mean squared error of a least squares polynomial from a single
+    fit, using the PRESS identity e_loo_i = e_i / (1 - h_ii) where h is the
+    diagonal of the hat matrix U U^T of the thin SVD of the Vandermonde matrix.
+
+    Dropping point i shrinks the smallest singular value by at most a factor
+    sqrt(1 - h_ii), so when that could take a fold under the RCOND cutoff the
+    folds are refitted one by one with it instead, as cross_val_score did.
+    """
+    V = design_matrix(x, degree, include_bias)
+    y = np.asarray(y, dtype=float).ravel()
+    if V.shape[0] <= V.shape[1]:
+        raise ValueError(
+            f"Leave-one-out needs more than {V.shape[1]} points for degree {degree}"
+        )
+    U, s, Wt = np.linalg.svd(V, full_matrices=False)
+    leverage = np.einsum("ij,ij->i", U, U)
+    if np.any(np.isclose(leverage, 1.0)):
+        raise ValueError(
+            f"A point has unit leverage, leave-one-out is undefined for degree {degree}"
+        )
+    if np.sqrt(1.0 - leverage.max()) * s[-1] > RCOND * s[0]:
+        coefs = Wt.T @ ((U.T @ y) / s)
+        loo_residuals = (y - V @ coefs) / (1.0 - leverage)
+    else:
+        loo_residuals = np.empty_like(y)
+        keep = np.ones(len(y), dtype=bool)
+        for i in range(len(y)):
+            keep[i] = False
+            coefs, *_ = np.linalg.lstsq(V[keep], y[keep], rcond=RCOND)
+            loo_residuals[i] = y[i] - V[i] @ coefs
+            keep[i] = True
+    return float(np.mean(loo_residuals**2))
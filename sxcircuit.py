@@ -0,0 +1,60 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+from utils.FlowsheetTemplate import (
+    CompiledFlowsheet,
+    FlowsheetInstance,
+    FlowsheetTemplate,
+)
+
+SX_CIRCUIT_TEMPLATE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "SXCircuit.json"
+)
+
+
+@lru_cache(maxsize=None)
+def sx_circuit() -> CompiledFlowsheet:
+    """
+    The template compiled on first use, not on import, as compiling fits the
+    isotherms and orders the units with networkx
+    """
+    return FlowsheetTemplate.from_json(SX_CIRCUIT_TEMPLATE).compile()
+
+
+@lru_cache(maxsize=None)
+def sx_instance() -> FlowsheetInstance:
+    """The one instance of this process every SXCircuit call re-solves"""
+    return sx_circuit().instance()
+
+
+def SXCircuit(
+    num_stage_extract: int,
+    num_stage_strip: int,
+    OA_extract: float,
+    OA_strip: float,
+    tentative_BO: float,
+    tentative_DR: float,
+    kremser_tolerance: float = None,
+) -> Optional[FlowsheetInstance]:
+    """
+    The PLSMixer, Extraction and Stripping circuit of data/SXCircuit.json
+    solved for one design, None if a unit reported an error. The instance is
+    shared, read its streams and units before the next call.
+    kremser_tolerance is that of both units' McCabeThiele, None steps every
+    stage.
+    """
+    instance = sx_instance()
+    result = instance.evaluate(
+        num_stage_extract=num_stage_extract,
+        num_stage_strip=num_stage_strip,
+        OA_extract=OA_extract,
+        OA_strip=OA_strip,
+        tentative_BO=tentative_BO,
+        tentative_DR=tentative_DR,
+        kremser_tolerance_extract=kremser_tolerance,
+        kremser_tolerance_strip=kremser_tolerance,
+    )
+    if not result.ok:
+        return None
+    return instance
@@ -0,0 +1,88 @@
+from functools import lru_cache
+
+from utils.FlowsheetTemplate import FlowsheetInstance
+from utils.Stream import Stream
+from utils.RecycleSolver import RecycleSolver
+from sxcircuit import sx_circuit
+
+UO2SO4_MASS_FLOW = Stream.accessor("UO2SO4", "mass_flow")
+
+
+@lru_cache(maxsize=None)
+def sx_loop_instance() -> FlowsheetInstance:
+    """Own instance of the SX circuit template, with both cascades solved"""
+    instance = sx_circuit().instance()
+    instance.flowsheet.set_params("Extraction", engine="cascade")
+    instance.flowsheet.set_params("Stripping", engine="cascade")
+    return instance
+
+
+def SXLoopSimulator(
+    num_stage_extract: int,
+    num_stage_strip: int,
+    OA_extract: float,
+    OA_strip: float,
+    efficiency: float = 0.95,
+    initial_BO: float = 0.005,
+    method: str = "wegstein",
+    tolerance: float = 1e-8,
+):
+    """
+    The SX circuit of data/SXCircuit.json with the barren organic (stream 5)
+    recycle closed, both cascades solved simultaneously. Flowsheet tears
+    stream 5 and converges it with RecycleSolver. Unlike bruteforce's
+    SXSimulator there is no tentative_BO / tentative_DR to sweep, initial_BO
+    only seeds the tear. Returns the same dict plus the recycle convergence,
+    or 0 when a cascade fails, also by reaching a negative or extrapolated
+    concentration, or the loop does not converge.
+    """
+    instance = sx_loop_instance()
+    instance.reset()
+    flowsheet = instance.flowsheet
+    flowsheet.set_params(
+        "Extraction",
+        num_stages=num_stage_extract,
+        efficiency=efficiency,
+        OA_ratio=OA_extract,
+        tentative_BO=initial_BO,
+    )
+    flowsheet.set_params(
+        "Stripping",
+        num_stages=num_stage_strip,
+        efficiency=efficiency,
+        OA_ratio=OA_strip,
+    )
+    result = flowsheet.run(method=method, tolerance=tolerance)
+    if not result.ok:
+        return 0
+
+    recycle = next(iter(result.recycles.values()))
+    depleted_raffinate = instance.streams[6]
+    Extraction_unit = instance.units["Extraction"]
+    Stripping_unit = instance.units["Stripping"]
+    return {
+        "params": {
+            "num_stage_extract": num_stage_extract,
+            "num_stage_strip": num_stage_strip,
+            "OA_extract": OA_extract,
+            "OA_strip": OA_strip,
+        },
+        "results": {
+            "wasted_uranium": UO2SO4_MASS_FLOW(depleted_raffinate),
+            "strip_liq_conc": Stripping_unit.get_strip_concentration(),
+            "extraction_per_stage": Extraction_unit.extraction_per_stage(),
+            "stripping_per_stage": Stripping_unit.stripping_per_stage(),
+            "barren_organic_Uconc": Extraction_unit.stripped_org_Uconc,
+            "raffinate_Uconc": float(Extraction_unit.profile.outlet_x[0]),
+        },
+        "recycle": {
+            "method": method,
+            "iterations": recycle.iterations,
+        },
+    }
+
+
+if __name__ == "__main__":
+    for method in RecycleSolver.METHODS:
+        result = SXLoopSimulator(4, 5, 1.625, 2.72, method=method)
+        print(method, result)
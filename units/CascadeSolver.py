@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from models.IsothermModeling import IsothermModel
+
+
+def solve_tridiagonal(
+    lower: np.ndarray, diag: np.ndarray, upper: np.ndarray, rhs: np.ndarray
+) -> np.ndarray:
+    """
+    Thomas algorithm on a stack of tridiagonal systems, all (M, N) arrays with
+    row m holding one system: lower[:, 0] and upper[:, -1] are ignored
+    """
+    n = diag.shape[1]
+    c = np.empty_like(diag)
+    d = np.empty_like(rhs)
+    c[:, 0] = upper[:, 0] / diag[:, 0]
+    d[:, 0] = rhs[:, 0] / diag[:, 0]
+    for i in range(1, n):
+        denom = diag[:, i] - lower[:, i] * c[:, i - 1]
+        c[:, i] = upper[:, i] / denom
+        d[:, i] = (rhs[:, i] - lower[:, i] * d[:, i - 1]) / denom
+    x = np.empty_like(rhs)
+    x[:, -1] = d[:, -1]
+    for i in range(n - 2, -1, -1):
+        x[:, i] = d[:, i] - c[:, i] * x[:, i + 1]
+    return x
+
+
+@dataclass
+class CascadeResult:
+    """
+    Stage profiles of CounterCurrentCascade.solve for M designs. x[:, n - 1] is
+    the feed phase leaving stage n (x[:, -1] the raffinate / stripped organic)
+    and y[:, n - 1] the other phase leaving stage n (y[:, 0] the loaded phase).
+    feasible is False for designs whose profile has a negative concentration
+    or an equilibrium point outside the data the isotherm was fitted to, the
+    residual can vanish there but the stages cannot exist.
+    """
+
+    x: np.ndarray
+    y: np.ndarray
+    converged: np.ndarray
+    feasible: np.ndarray
+    iterations: int
+    residual: np.ndarray
+
+    @property
+    def ok(self) -> np.ndarray:
+        """Converged to a feasible profile, per design"""
+        return self.converged & self.feasible
+
+    @property
+    def outlet_x(self) -> np.ndarray:
+        return self.x[:, -1]
+
+    @property
+    def outlet_y(self) -> np.ndarray:
+        return self.y[:, 0]
+
+
+class CounterCurrentCascade:
+    """
+    N counter-current stages solved simultaneously instead of stepped. The feed
+    phase (x) enters stage 1 at feed and leaves stage N, the other phase (y)
+    enters stage N at solvent and leaves stage 1, with flow_ratio = feed phase
+    volume / other phase volume, the operating line slope of McCabeThiele.
+    Stage n with Murphree efficiency E on the feed phase has
+
+        y_n = isotherm((x_n - (1 - E) x_n-1) / E)
+        flow_ratio (x_n-1 - x_n) = y_n - y_n+1,   x_0 = feed, y_N+1 = solvent
+
+    so the residuals of x_1..x_N couple neighbouring stages only, and every
+    Newton step is a tridiagonal solve, done for all designs at once.
+    """
+
+    # concentration slack of the feasibility check, for roundoff around 0
+    FEASIBILITY_SLACK = 1e-9
+
+    def __init__(self, isotherm_model: IsothermModel) -> None:
+        self.isotherm_poly = isotherm_model.characteristic_poly
+        self.derivative_poly = self.isotherm_poly.deriv()
+        self.x_range = isotherm_model.x_range
+
+    def __residual(self, x, feed, solvent, ratio, efficiency):
+        x_prev = np.concatenate([feed[:, None], x[:, :-1]], axis=1)
+        equilibrium = (x - (1 - efficiency[:, None]) * x_prev) / efficiency[:, None]
+        y = self.isotherm_poly(equilibrium)
+        y_next = np.concatenate([y[:, 1:], solvent[:, None]], axis=1)
+        return ratio[:, None] * (x_prev - x) - y + y_next, equilibrium, y
+
+    def solve(
+        self,
+        feed: np.ndarray,
+        solvent: np.ndarray,
+        flow_ratio: np.ndarray,
+        num_stages: int,
+        efficiency: np.ndarray = 1,
+        initial: np.ndarray = None,
+        tolerance: float = 1e-12,
+        max_iterations: int = 50,
+    ) -> CascadeResult:
+        """
+        feed, solvent, flow_ratio and efficiency are scalars or length M
+        arrays. initial is an (M, num_stages) guess of x, e.g. the profile of
+        a neighbouring design, by default a straight line from feed down to
+        the feed phase in equilibrium with the incoming solvent
+        """
+        feed, solvent, ratio, efficiency = (
+            np.array(arg, dtype=float)
+            for arg in np.broadcast_arrays(
+                *(np.atleast_1d(arg) for arg in (feed, solvent, flow_ratio, efficiency))
+            )
+        )
+        m = feed.shape[0]
+        if initial is None:
+            lowest = self.__invert(solvent, feed)
+            fraction = np.arange(1, num_stages + 1) / num_stages
+            x = feed[:, None] + (lowest - feed)[:, None] * fraction
+        else:
+            x = np.array(np.broadcast_to(initial, (m, num_stages)), dtype=float)
+
+        residual, equilibrium, y = self.__residual(x, feed, solvent, ratio, efficiency)
+        norm = np.abs(residual).max(axis=1)
+        scale = 1 + np.abs(feed) * ratio + np.abs(solvent)
+        converged = norm <= tolerance * scale
+        iterations = 0
+        e = efficiency[:, None]
+        while not converged.all() and iterations < max_iterations:
+            iterations += 1
+            rows = np.flatnonzero(~converged)
+            slope = self.derivative_poly(equilibrium[rows]) / e[rows]
+            slope_next = np.concatenate(
+                [slope[:, 1:], np.zeros((len(rows), 1))], axis=1
+            )
+            r = ratio[rows, None]
+            lower = r + slope * (1 - e[rows])
+            diag = -r - slope - slope_next * (1 - e[rows])
+            step = solve_tridiagonal(lower, diag, slope_next, -residual[rows])
+
+            # halve the step until the residual drops, Newton can overshoot
+            # where the isotherm polynomial bends
+            damping = np.ones(len(rows))
+            for _ in range(30):
+                trial = x[rows] + damping[:, None] * step
+                trial_residual, trial_eq, trial_y = self.__residual(
+                    trial, feed[rows], solvent[rows], ratio[rows], efficiency[rows]
+                )
+                trial_norm = np.abs(trial_residual).max(axis=1)
+                worse = ~(trial_norm < norm[rows]) & (
+                    trial_norm > tolerance * scale[rows]
+                )
+                if not worse.any():
+                    break
+                damping[worse] *= 0.5
+            x[rows] = trial
+            residual[rows], equilibrium[rows], y[rows] = (
+                trial_residual,
+                trial_eq,
+                trial_y,
+            )
+            norm[rows] = trial_norm
+            converged[rows] = trial_norm <= tolerance * scale[rows]
+
+        slack = CounterCurrentCascade.FEASIBILITY_SLACK
+        feasible = (
+            (x >= -slack).all(axis=1)
+            & (y >= -slack).all(axis=1)
+            & (equilibrium >= self.x_range[0] - slack).all(axis=1)
+            & (equilibrium <= self.x_range[1] + slack).all(axis=1)
+        )
+        return CascadeResult(
+            x=x,
+            y=y,
+            converged=converged,
+            feasible=feasible,
+            iterations=iterations,
+            residual=norm,
+        )
+
+    def __invert(self, y: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """A few Newton steps on isotherm(x) = y from start, for a first guess"""
+        x = start.copy()
+        for _ in range(20):
+            slope = self.derivative_poly(x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step = np.where(slope != 0, (self.isotherm_poly(x) - y) / slope, 0.0)
+            x = np.where(np.isfinite(step), x - step, x)
+        return np.where(np.isfinite(x), x, 0.0)
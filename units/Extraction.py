@@ -1,15 +1,32 @@
-from typing import Dict
+from typing import Dict, Optional
 from units.UnitBaseClass import UnitInterface
-from units.McCabeThiele import McCabeThiele
+from units.McCabeThiele import McCabeThiele, StageCounts
+from units.CascadeSolver import CascadeResult, CounterCurrentCascade
 from models.IsothermModeling import IsothermModel
 from utils.Stream import Stream
+from utils.SpeciesRegistry import SPECIES
 from utils.Components import UO2SO4, ShellSolD70, Cyanex923, Isodecanol
-from copy import deepcopy
 
 from numpy.polynomial import Polynomial
 
+UO2SO4_MASS_FLOW = Stream.accessor("UO2SO4", "mass_flow")
+
 
 class Extraction(UnitInterface):
+    ENGINES = ("staircase", "cascade")
+    PARAMETERS = (
+        "isotherm_model",
+        "num_stages",
+        "efficiency",
+        "OA_ratio",
+        "tentative_BO",
+        "tentative_DR",
+        "plot",
+        "root_solver",
+        "engine",
+        "kremser_tolerance",
+    )
+
     def __init__(
         self,
         name: str,
@@ -24,66 +41,122 @@ class Extraction(UnitInterface):
         tentative_BO: float = 0.01,
         tentative_DR: float = 0.08,
         plot: bool = False,
+        root_solver: str = "eigen",
+        engine: str = "staircase",
+        kremser_tolerance: float = None,
     ) -> None:
-        super().__init__(name)
+        """
+        engine staircase steps McCabeThiele down to tentative_DR. engine cascade
+        solves the stages simultaneously, so the raffinate is a result and
+        tentative_DR is unused. With cascade, a stripped organic flagged as
+        recycle keeps the uranium it carries, tentative_BO only seeds it.
+        kremser_tolerance is passed to McCabeThiele for the staircase engine.
+        """
+        super().__init__(
+            name,
+            isotherm_model=isotherm_model,
+            num_stages=num_stages,
+            efficiency=efficiency,
+            OA_ratio=OA_ratio,
+            # NOTE
+            tentative_BO=tentative_BO,
+            tentative_DR=tentative_DR,
+            plot=plot,
+            root_solver=root_solver,
+            engine=engine,
+            kremser_tolerance=kremser_tolerance,
+        )
         self.name = name
-        self.__isotherm_model = isotherm_model
         self.__pls = pls
         self.__stripped_organic = stripped_organic
         self.__loaded_organic = loaded_organic
         self.__depleted_raffinate = depleted_raffinate
-        self.__num_stages = num_stages
-        self.__efficiency = efficiency
-        self.__OA_ratio = OA_ratio
-        self.__plot = plot
         self.__error = False
+        self.__mcct = None
 
-        # NOTE
-        self.__tentative_BO = tentative_BO
-        self.__tentative_DR = tentative_DR
+        self.solve()
 
+    def solve(self) -> None:
+        if self._params["engine"] not in Extraction.ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(Extraction.ENGINES)}")
+        self.__error = False
         self.__size_organics()
         self.__build_mcct()
         self.__update_outlets()
 
     def __size_organics(self) -> None:
         pls_volume = self.__pls.total_volume
-        self.__stripped_organic.update_components(
+        OA_ratio = self._params["OA_ratio"]
+        uo2so4_mass = (self._params["tentative_BO"] * pls_volume * OA_ratio) / 0.6502
+        if (
+            self._params["engine"] == "cascade"
+            and self.__stripped_organic.recycle
+            and self.__stripped_organic.present[SPECIES.index(UO2SO4.NAME)]
+        ):
+            uo2so4_mass = UO2SO4_MASS_FLOW(self.__stripped_organic)
+        with self.__stripped_organic.bulk_update(reset=True) as organic:
+            organic.set_component_flow(
+                ShellSolD70.NAME, pls_volume * 0.8 * OA_ratio, "volume"
+            )
+            organic.set_component_flow(
+                Cyanex923.NAME, pls_volume * 0.1 * OA_ratio, "volume"
+            )
+            organic.set_component_flow(
+                Isodecanol.NAME, pls_volume * 0.1 * OA_ratio, "volume"
+            )
+            organic.set_component_flow(UO2SO4.NAME, uo2so4_mass, "mass")
+
+    def __operating_line(self) -> Polynomial:
+        return Polynomial(
             [
-                ShellSolD70(pls_volume * 0.8 * self.__OA_ratio, "volume"),
-                Cyanex923(pls_volume * 0.1 * self.__OA_ratio, "volume"),
-                Isodecanol(pls_volume * 0.1 * self.__OA_ratio, "volume"),
-                UO2SO4(
-                    (self.__tentative_BO * pls_volume * self.__OA_ratio) / 0.6502,
-                    "mass",
-                ),
+                self._params["tentative_BO"]
+                - (
+                    self._params["tentative_DR"]
+                    * self.__pls.total_volume
+                    / self.__stripped_organic.total_volume
+                ),  # b
+                self.__pls.total_volume / self.__stripped_organic.total_volume,  # m
             ]
         )
 
+    def __pls_Uconc(self) -> float:
+        return (UO2SO4_MASS_FLOW(self.__pls) * 0.6502) / self.__pls.total_volume
+
+    def __mcct_for(self, num_stages: Optional[int], plot: bool) -> McCabeThiele:
+        return McCabeThiele(
+            self._params["isotherm_model"],
+            operating_line=self.__operating_line(),
+            inlet_Uconcentration=self.__pls_Uconc(),
+            num_stages=num_stages,
+            efficiency=self._params["efficiency"],
+            plot=plot,
+            root_solver=self._params["root_solver"],
+            min=self._params["tentative_DR"],
+            kremser_tolerance=self._params["kremser_tolerance"],
+        )
+
     def __build_mcct(self) -> None:
-        pls_Uconc = (
-            self.__pls.get_component_property("UO2SO4", "mass_flow") * 0.6502
-        ) / self.__pls.total_volume
-
-        self.__mcct = McCabeThiele(
-            self.__isotherm_model,
-            operating_line=Polynomial(
-                [
-                    self.__tentative_BO
-                    - (
-                        self.__tentative_DR
-                        * self.__pls.total_volume
-                        / self.__stripped_organic.total_volume
-                    ),  # b
-                    self.__pls.total_volume / self.__stripped_organic.total_volume,  # m
-                ]
-            ),
-            inlet_Uconcentration=pls_Uconc,
-            num_stages=self.__num_stages,
-            efficiency=self.__efficiency,
-            plot=self.__plot,
-            min=self.__tentative_DR,
+        if self._params["engine"] == "cascade":
+            self.__solve_cascade()
+            return
+        mcct_key = (
+            self._params["isotherm_model"],
+            self._params["efficiency"],
+            self._params["root_solver"],
+            self._params["kremser_tolerance"],
         )
+        plot = self._params["plot"]
+        if self.__mcct is not None and not plot and self.__mcct_key == mcct_key:
+            # same isotherm and stages, only the design changed
+            self.__mcct.solve(
+                operating_line=self.__operating_line(),
+                inlet_Uconcentration=self.__pls_Uconc(),
+                num_stages=self._params["num_stages"],
+                min=self._params["tentative_DR"],
+            )
+        else:
+            self.__mcct = self.__mcct_for(self._params["num_stages"], plot)
+            self.__mcct_key = mcct_key
         if self.__mcct.error:
             self.__error = True
             return
@@ -100,29 +173,38 @@ class Extraction(UnitInterface):
             self.__depleted_raffinate_Uconc / self.__inital_pls_Uconc
         )
 
+    def __solve_cascade(self) -> None:
+        self.profile = self.cascade()
+        if not self.profile.ok[0]:
+            self.__error = True
+            return
+        organic_volume = self.__stripped_organic.total_volume
+        self.__inital_pls_Uconc = self.__pls_Uconc()
+        self.__depleted_raffinate_Uconc = float(self.profile.outlet_x[0])
+        self.loaded_org_Uconc = float(self.profile.outlet_y[0])
+        self.stripped_org_Uconc = (
+            UO2SO4_MASS_FLOW(self.__stripped_organic) * 0.6502
+        ) / organic_volume
+        self.extraction_percent = 1 - (
+            self.__depleted_raffinate_Uconc / self.__inital_pls_Uconc
+        )
+
     def __update_outlets(self) -> None:
         if self.__error:
             return
-        loaded_org_comps = deepcopy(self.__stripped_organic.components)
         uo2so4_mass = (
             self.loaded_org_Uconc * self.__stripped_organic.total_volume
         ) / 0.6502
+        self.__stripped_organic.derive(
+            self.__loaded_organic, {UO2SO4.NAME: uo2so4_mass}
+        )
 
-        for c in loaded_org_comps:
-            if c.name == "UO2SO4":
-                c.update_flow(uo2so4_mass, "mass")
-        self.__loaded_organic.update_components(loaded_org_comps)
-
-        dr_comps = deepcopy(self.__pls.components)
         uo2so4_mass2 = (
-            self.__pls.get_component_property("UO2SO4", "mass_flow")
-            + self.__stripped_organic.get_component_property("UO2SO4", "mass_flow")
+            UO2SO4_MASS_FLOW(self.__pls)
+            + UO2SO4_MASS_FLOW(self.__stripped_organic)
             - uo2so4_mass
         )
-        for c in dr_comps:
-            if c.name == "UO2SO4":
-                c.update_flow(uo2so4_mass2, "mass")
-        self.__depleted_raffinate.update_components(dr_comps)
+        self.__pls.derive(self.__depleted_raffinate, {UO2SO4.NAME: uo2so4_mass2})
         self.mass_balance_check()
 
     def error(self):
@@ -145,7 +227,37 @@ class Extraction(UnitInterface):
             raise ValueError("Failed Mass Balance on Extraction!")
     
     def extraction_per_stage(self) -> float:
-        return (self.__inital_pls_Uconc - self.__depleted_raffinate_Uconc) / self.__num_stages
+        return (
+            self.__inital_pls_Uconc - self.__depleted_raffinate_Uconc
+        ) / self._params["num_stages"]
+
+    def stage_counts(
+        self, max_stages: int, raffinate_target: float = None
+    ) -> StageCounts:
+        """
+        Feasibility, raffinate and per-stage extraction of every stage count
+        1..max_stages from a single staircase pass, stopping early once the
+        raffinate gets down to raffinate_target. The outlet streams do not
+        depend on the stage count, only whether it is feasible does.
+        """
+        return self.__mcct_for(None, False).stage_counts(max_stages, raffinate_target)
+
+    def cascade(self) -> CascadeResult:
+        """
+        Stage profiles of this extraction solved simultaneously, from the PLS
+        and the stripped organic as sized, without assuming tentative_DR.
+        outlet_x is then the raffinate the stages actually reach.
+        """
+        pls_volume = self.__pls.total_volume
+        organic_volume = self.__stripped_organic.total_volume
+        return CounterCurrentCascade(self._params["isotherm_model"]).solve(
+            feed=(UO2SO4_MASS_FLOW(self.__pls) * 0.6502) / pls_volume,
+            solvent=(UO2SO4_MASS_FLOW(self.__stripped_organic) * 0.6502)
+            / organic_volume,
+            flow_ratio=pls_volume / organic_volume,
+            num_stages=self._params["num_stages"],
+            efficiency=self._params["efficiency"],
+        )
 
     def get_operating_conditions(self) -> Dict[str, float]:
         pass
@@ -0,0 +1,97 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.polynomial import Polynomial
+
+
+def linearize(
+    poly: Polynomial, lower: float, upper: float, tolerance: float, samples: int = 33
+) -> Optional[Tuple[float, float]]:
+    """
+    (intercept, slope) of the least squares line through poly on [lower, upper],
+    None if the line is off by more than tolerance anywhere on the samples
+    """
+    x = np.linspace(lower, upper, samples)
+    y = poly(x)
+    slope, intercept = np.polyfit(x, y, 1)
+    if np.max(np.abs(intercept + slope * x - y)) > tolerance:
+        return None
+    return float(intercept), float(slope)
+
+
+def linearize_rows(
+    poly: Polynomial,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    tolerance: float,
+    samples: int = 33,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    linearize for every row of lower / upper at once: (intercept, slope, ok)
+    arrays, ok False where the line is off by more than tolerance
+    """
+    x = lower[:, None] + (upper - lower)[:, None] * np.linspace(0, 1, samples)
+    y = poly(x)
+    x_mean = x.mean(axis=1, keepdims=True)
+    y_mean = y.mean(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = ((x - x_mean) * (y - y_mean)).sum(axis=1) / (
+            (x - x_mean) ** 2
+        ).sum(axis=1)
+    intercept = y_mean[:, 0] - slope * x_mean[:, 0]
+    deviation = np.abs(intercept[:, None] + slope[:, None] * x - y).max(axis=1)
+    ok = np.isfinite(slope) & (deviation <= tolerance)
+    return intercept, slope, ok
+
+
+class KremserCascade:
+    """
+    Closed form McCabeThiele staircase for a linear isotherm y = a + b x and
+    operating line y = c + m x. A stage of Murphree efficiency E takes x_k to
+
+        x_k+1 = alpha x_k + beta, alpha = 1 - E (1 - m / b), beta = E (c - a) / b
+
+    so x_k = x* + (x_0 - x*) alpha^k around the fixed point x* = beta / (1 - alpha),
+    which is the Kremser equation with b / m as the extraction factor. Only the
+    geometrically decaying case 0 < alpha < 1 is handled, valid is False
+    otherwise and the caller should step the stages instead.
+
+    The isotherm is only within the linearize tolerance of the line, so when
+    x after the last stage lands within about that distance of min, the stage
+    count reaching min, and with it feasibility, can differ by one from the
+    stepped staircase.
+    """
+
+    def __init__(
+        self,
+        isotherm_line: Tuple[float, float],
+        operating_line: Tuple[float, float],
+        inlet: float,
+        efficiency: float,
+    ) -> None:
+        a, b = isotherm_line
+        c, m = operating_line
+        self.inlet = inlet
+        self.alpha = 1 - efficiency * (1 - m / b) if b != 0 else np.nan
+        self.valid = bool(0 < self.alpha < 1)
+        if self.valid:
+            beta = efficiency * (c - a) / b
+            self.fixed_point = beta / (1 - self.alpha)
+
+    def x_after(self, num_stages: int) -> float:
+        return self.fixed_point + (self.inlet - self.fixed_point) * (
+            self.alpha**num_stages
+        )
+
+    def stages_to(self, min: float) -> Optional[int]:
+        """
+        First stage count that takes x below min, 0 if the inlet already is
+        below it, None if it never gets there
+        """
+        if self.inlet < min:
+            return 0
+        if self.fixed_point >= min:
+            return None
+        ratio = (min - self.fixed_point) / (self.inlet - self.fixed_point)
+        return math.floor(math.log(ratio) / math.log(self.alpha)) + 1
@@ -1,36 +1,270 @@
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Union
+
 import numpy as np
 from numpy.polynomial import Polynomial
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-
 
 from models.IsothermModeling import IsothermModel
+from models.IsothermInverse import NewtonRootSolver
+from units.Kremser import KremserCascade, linearize
+
+
+@dataclass
+class StageStep:
+    """One stage of a staircase, transfer is the drop in x across it"""
+
+    stage: int
+    x: float
+    y: float
+    transfer: float
+    at_min: bool
+
+
+@dataclass
+class StageCounts:
+    """
+    McCabeThiele.stage_counts result. Entry n - 1 of the arrays is the outcome
+    with n stages, as get_bottom_coord and error would report it, and transfer
+    is the drop in x across stage n.
+    """
+
+    top_x: float
+    top_y: float
+    bottom_x: np.ndarray
+    bottom_y: np.ndarray
+    transfer: np.ndarray
+    error: np.ndarray
+    pinch: bool
+    stages_run: int
+
+    @property
+    def feasible_stages(self) -> List[int]:
+        return [int(i) + 1 for i in np.flatnonzero(~self.error)]
+
+    def per_stage(self, num_stages: int) -> float:
+        """Average drop in x per stage with num_stages stages"""
+        return (self.top_x - self.bottom_x[num_stages - 1]) / num_stages
+
+
+class McCabeThieleResult:
+    """
+    Outcome of McCabeThiele.solve. staircase_x / staircase_y hold one
+    [start, end] segment per row, the inlet riser and then a horizontal and a
+    vertical segment per stage stepped, and are None unless the staircase was
+    recorded. path is "kremser" when the closed form was used instead of
+    stepping.
+    """
+
+    __slots__ = (
+        "top_x",
+        "top_y",
+        "bottom_x",
+        "bottom_y",
+        "error",
+        "pinch",
+        "stages_run",
+        "staircase_x",
+        "staircase_y",
+        "path",
+    )
+
+    def __init__(
+        self,
+        top_x: float,
+        top_y: float,
+        bottom_x: float,
+        bottom_y: float,
+        error: bool,
+        pinch: bool,
+        stages_run: int,
+        staircase_x: Optional[np.ndarray] = None,
+        staircase_y: Optional[np.ndarray] = None,
+        path: str = "stepping",
+    ) -> None:
+        self.top_x = top_x
+        self.top_y = top_y
+        self.bottom_x = bottom_x
+        self.bottom_y = bottom_y
+        self.error = error
+        self.pinch = pinch
+        self.stages_run = stages_run
+        self.staircase_x = staircase_x
+        self.staircase_y = staircase_y
+        self.path = path
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in McCabeThieleResult.__slots__
+        )
+        return f"McCabeThieleResult({fields})"
 
 
 class McCabeThiele:
+    ROOT_SOLVERS = ("eigen", "lookup", "newton")
+
     def __init__(
         self,
         isotherm_model: IsothermModel,
         operating_line: Polynomial,  # OpLine = Va/Vo
         inlet_Uconcentration: float,
-        num_stages: int,
+        num_stages: Optional[int],
         efficiency: float,
         plot: bool,
         min: float = 0,
+        root_solver: Union[str, NewtonRootSolver] = "eigen",
+        record_staircase: bool = None,
+        kremser_tolerance: float = None,
     ) -> None:
+        """
+        root_solver picks how each stage solves isotherm(x) = y:
+            eigen : companion matrix eigenvalues of the isotherm polynomial
+            lookup : the model's cached IsothermInverse
+            newton : the model's shared NewtonRootSolver, warm started from the
+                     same stage of the previous design, or a NewtonRootSolver
+                     instance to keep separate warm starts and iteration counts
+        lookup and newton fall back to eigen where they cannot bracket a root.
+        num_stages=None skips the solve, for step_stages, stage_counts or a
+        later solve(). record_staircase (default: plot) keeps every staircase
+        segment, otherwise only the top and bottom coordinates are kept, so it
+        cannot be False with plot.
+        With a kremser_tolerance, solve uses the closed form KremserCascade
+        whenever the isotherm stays within that distance of a straight line
+        over the operating range and no staircase is recorded. Feasibility can
+        then differ from stepping for designs that end within about the
+        tolerance of min, see KremserCascade.
+        """
+        if isinstance(root_solver, NewtonRootSolver):
+            self.root_solver = root_solver
+        elif root_solver == "newton":
+            self.root_solver = isotherm_model.newton_solver()
+        elif root_solver == "lookup":
+            self.root_solver = isotherm_model.inverse()
+        elif root_solver == "eigen":
+            self.root_solver = None
+        else:
+            raise ValueError(
+                f"root_solver must be one of {', '.join(McCabeThiele.ROOT_SOLVERS)}"
+            )
+        if plot and record_staircase is False:
+            raise ValueError(
+                "plot needs the staircase, record_staircase cannot be False"
+            )
         self.isotherm_poly = isotherm_model.characteristic_poly
+        self.__efficiency = efficiency
+        self.__kremser_tolerance = kremser_tolerance
+        self.__record_staircase = (
+            plot if record_staircase is None else record_staircase
+        )
+        self.result = None
+        self.__configure(operating_line, inlet_Uconcentration, num_stages, min)
+        if num_stages is None:
+            return
+        self.solve()
+
+        if plot:
+            self.__plot()
+
+    def __configure(
+        self,
+        operating_line: Polynomial,
+        inlet_Uconcentration: float,
+        num_stages: Optional[int],
+        min: float,
+    ) -> None:
         self.operating_line = operating_line
         self.__inlet_Uconcentration = inlet_Uconcentration
-        self.__efficiency = efficiency
         self.__num_stages = num_stages
         self.__min = min
         self.error = False
-        self.__create_staircase()
+        self.pinch = bool(
+            self.operating_line(inlet_Uconcentration)
+            > self.isotherm_poly(inlet_Uconcentration)
+        )
 
-        if plot:
-            self.__plot()
+    def solve(
+        self,
+        operating_line: Polynomial = None,
+        inlet_Uconcentration: float = None,
+        num_stages: int = None,
+        min: float = None,
+    ) -> McCabeThieleResult:
+        """
+        Steps the staircase, first replacing any of the given design values,
+        so one instance can be re-solved for many operating lines
+        """
+        self.__configure(
+            self.operating_line if operating_line is None else operating_line,
+            (
+                self.__inlet_Uconcentration
+                if inlet_Uconcentration is None
+                else inlet_Uconcentration
+            ),
+            self.__num_stages if num_stages is None else num_stages,
+            self.__min if min is None else min,
+        )
+        if self.__num_stages is None:
+            raise ValueError("McCabeThiele.solve needs num_stages")
+        self.result = None
+        if (
+            self.__kremser_tolerance is not None
+            and not self.__record_staircase
+            and not self.pinch
+        ):
+            self.result = self.__kremser()
+        if self.result is None:
+            self.result = self.__create_staircase()
+        self.error = self.result.error
+        return self.result
+
+    def __kremser(self) -> Optional[McCabeThieleResult]:
+        """Closed form outcome, None where the isotherm is not linear enough"""
+        if len(self.operating_line.coef) != 2:
+            return None
+        top_x = self.__inlet_Uconcentration
+        # stage roots span from the one leaving the min point up to the inlet
+        lowest_root = self.__stage_root(self.operating_line(self.__min), None)
+        if lowest_root is None or lowest_root >= top_x:
+            return None
+        isotherm_line = linearize(
+            self.isotherm_poly, lowest_root, top_x, self.__kremser_tolerance
+        )
+        if isotherm_line is None:
+            return None
+        cascade = KremserCascade(
+            isotherm_line,
+            tuple(self.operating_line.coef),
+            top_x,
+            self.__efficiency,
+        )
+        if not cascade.valid:
+            return None
+
+        stages_to_min = cascade.stages_to(self.__min)
+        if stages_to_min == 0:
+            # inlet already below min, stepping clips the first stage to min
+            return None
+        if stages_to_min is not None and stages_to_min <= self.__num_stages:
+            stages_run = stages_to_min
+            bottom_x = self.__min
+        else:
+            stages_run = self.__num_stages
+            bottom_x = cascade.x_after(self.__num_stages)
+        return McCabeThieleResult(
+            top_x=top_x,
+            top_y=self.operating_line(top_x),
+            bottom_x=bottom_x,
+            bottom_y=self.operating_line(bottom_x),
+            error=stages_to_min != self.__num_stages,
+            pinch=False,
+            stages_run=stages_run,
+            path="kremser",
+        )
 
     def __plot(self) -> None:
+        # matplotlib is imported on demand, sweeps never plot
+        import matplotlib.pyplot as plt
+        from matplotlib.ticker import MaxNLocator
+
         # Generate isotherm data
         X_isotherm = np.linspace(0, self.__inlet_Uconcentration, 100)
         Y_isotherm = self.isotherm_poly(X_isotherm)
@@ -49,8 +283,8 @@ class McCabeThiele:
         )
 
         # Plot staircase
-        for i in range(len(self.__X_staircase)):
-            ax.plot(self.__X_staircase[i], self.__Y_staircase[i], c="black", linestyle='-', linewidth=2)
+        for xs, ys in zip(self.result.staircase_x, self.result.staircase_y):
+            ax.plot(xs, ys, c="black", linestyle='-', linewidth=2)
 
         # Set limits
         ax.set_xlim(left=0)
@@ -79,79 +313,139 @@ class McCabeThiele:
         # Adjust the padding between and around subplots and display the plot
         plt.show()
 
-    def __create_staircase(self) -> None:
-        self.__X_staircase = [
-            [self.__inlet_Uconcentration, self.__inlet_Uconcentration]
-        ]
-        self.__Y_staircase = [[0, self.operating_line(self.__inlet_Uconcentration)]]
-
-        current = [
-            self.__inlet_Uconcentration,
-            self.operating_line(self.__inlet_Uconcentration),
-        ]
-
-        if self.operating_line(self.__inlet_Uconcentration) > self.isotherm_poly(
-            self.__inlet_Uconcentration
-        ):
-            self.error = True
+    def __create_staircase(self) -> McCabeThieleResult:
+        top_x = self.__inlet_Uconcentration
+        top_y = self.operating_line(top_x)
+        result = McCabeThieleResult(
+            top_x=top_x,
+            top_y=top_y,
+            bottom_x=top_x,
+            bottom_y=top_y,
+            error=True,
+            pinch=self.pinch,
+            stages_run=0,
+        )
+        if self.__record_staircase:
+            # riser plus two segments per stage, trimmed to the stages stepped
+            staircase_x = np.empty((1 + 2 * self.__num_stages, 2))
+            staircase_y = np.empty((1 + 2 * self.__num_stages, 2))
+            staircase_x[0] = [top_x, top_x]
+            staircase_y[0] = [0, top_y]
+
+        if not self.pinch:
+            x, y = top_x, top_y
+            for step in self.step_stages(self.__num_stages):
+                if self.__record_staircase:
+                    row = 2 * step.stage - 1
+                    staircase_x[row] = [x, step.x]
+                    staircase_y[row] = [y, y]
+                    staircase_x[row + 1] = [step.x, step.x]
+                    staircase_y[row + 1] = [y, step.y]
+                x, y = step.x, step.y
+                result.stages_run = step.stage
+                # success only when min is reached on exactly the last stage
+                result.error = not (step.at_min and step.stage == self.__num_stages)
+            result.bottom_x, result.bottom_y = x, y
+
+        if self.__record_staircase:
+            rows = 1 + 2 * result.stages_run
+            result.staircase_x = staircase_x[:rows]
+            result.staircase_y = staircase_y[:rows]
+        return result
+
+    def step_stages(self, max_stages: int) -> Iterator[StageStep]:
+        """
+        Steps the staircase down from the inlet one stage at a time. The
+        N stage staircase is a prefix of the N + 1 stage one, so a single pass
+        answers every stage count. Stops after the stage that reaches min, or
+        at once on a pinch. Lazy, so callers can break out early.
+        """
+        if self.pinch:
             return
-        repeat_flag = False
-
-        for _ in range(self.__num_stages):
-            if repeat_flag:
-                self.error = True
-                return
-            intersection_poly = self.isotherm_poly - Polynomial([current[1]])
-            roots = intersection_poly.roots()
-
-            real_roots = [
-                root.real for root in roots if np.isclose(root.imag, 0, atol=1e-8)
-            ]
-            real_roots_rev = real_roots[::-1]
-
-            x = next(
-                (
-                    current[0] - ((current[0] - root) * self.__efficiency)
-                    for root in real_roots_rev
-                    if root <= self.__inlet_Uconcentration
-                ),
-                None,
-            )
-
-            if x < self.__min:
-                repeat_flag = True
-                x = self.__min
-
-            if x is None:
+        x = self.__inlet_Uconcentration
+        y = self.operating_line(x)
+        for stage in range(1, max_stages + 1):
+            root = self.__stage_root(y, stage - 1)
+            if root is None:
                 raise ValueError("No Real Roots found in McCabe and Thiele range")
+            x_next = x - ((x - root) * self.__efficiency)
+            at_min = x_next < self.__min
+            if at_min:
+                x_next = self.__min
+            y = self.operating_line(x_next)
+            yield StageStep(stage, x_next, y, x - x_next, at_min)
+            if at_min:
+                return
+            x = x_next
 
-            y = current[1]
-            self.__X_staircase.append([current[0], x])
-            self.__Y_staircase.append([current[1], y])
-            current = [x, y]
-
-            y = self.operating_line(x)
-            self.__X_staircase.append([current[0], x])
-            self.__Y_staircase.append([current[1], y])
-            current = [x, y]
+    def stage_counts(self, max_stages: int, target: float = None) -> StageCounts:
+        """
+        Outcome of every stage count 1..max_stages from one step_stages pass.
+        With a target the pass also stops once the staircase gets down to it,
+        counts past that are left unevaluated (nan, error).
+        """
+        top_y = self.operating_line(self.__inlet_Uconcentration)
+        bottom_x = np.full(max_stages, np.nan)
+        bottom_y = np.full(max_stages, np.nan)
+        transfer = np.full(max_stages, np.nan)
+        error = np.ones(max_stages, dtype=bool)
+        stages_run = 0
+        for step in self.step_stages(max_stages):
+            i = step.stage - 1
+            bottom_x[i], bottom_y[i], transfer[i] = step.x, step.y, step.transfer
+            stages_run = step.stage
+            if step.at_min:
+                # exactly this many stages works, more would be overstaged
+                error[i] = False
+                bottom_x[i + 1 :], bottom_y[i + 1 :] = step.x, step.y
+                break
+            if target is not None and step.x <= target:
+                break
+        return StageCounts(
+            top_x=self.__inlet_Uconcentration,
+            top_y=top_y,
+            bottom_x=bottom_x,
+            bottom_y=bottom_y,
+            transfer=transfer,
+            error=error,
+            pinch=self.pinch,
+            stages_run=stages_run,
+        )
 
-        if not repeat_flag:
-            self.error = True
-            return
+    def __stage_root(self, y: float, stage: int) -> float:
+        """Largest real root of isotherm(x) = y below the inlet concentration"""
+        if isinstance(self.root_solver, NewtonRootSolver):
+            root = self.root_solver.root(y, self.__inlet_Uconcentration, key=stage)
+        elif self.root_solver is not None:
+            root = self.root_solver.root(y, self.__inlet_Uconcentration)
+        else:
+            root = np.nan
+        if root == root:  # nan when the solver could not bracket the root
+            return root
+
+        intersection_poly = self.isotherm_poly - Polynomial([y])
+        roots = intersection_poly.roots()
+
+        real_roots = [
+            root.real for root in roots if np.isclose(root.imag, 0, atol=1e-8)
+        ]
+        real_roots_rev = real_roots[::-1]
 
-        # print(self.__X_staircase)
-        # print()
+        return next(
+            (root for root in real_roots_rev if root <= self.__inlet_Uconcentration),
+            None,
+        )
 
     def get_top_coord(self) -> float:
         """
         Extraction : [initialPLS, loadedOrganic]
         Stripping : [Loaded Organic, Strip Liquor]
         """
-        return [self.__X_staircase[0][1], self.__Y_staircase[0][1]]
+        return [self.result.top_x, self.result.top_y]
 
     def get_bottom_coord(self) -> float:
         """
         Extraction : [Raffinate, Stripped Organic]
         Stripping : [Stripped Organic, Diluted Acid]
         """
-        return [self.__X_staircase[-1][1], self.__Y_staircase[-1][1]]
+        return [self.result.bottom_x, self.result.bottom_y]
@@ -0,0 +1,232 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+from numpy.polynomial import polynomial as P
+
+from models.IsothermModeling import IsothermModel
+from units.Kremser import linearize_rows
+
+
+def largest_real_roots_below(
+    coefs: np.ndarray, y: np.ndarray, upper: np.ndarray
+) -> np.ndarray:
+    """
+    For every row, the largest real root of poly(x) = y[row] that is <= upper[row],
+    nan where there is none. Same companion-matrix eigenvalues and real-root
+    filter as Polynomial.roots() in McCabeThiele, for a whole stack at once.
+    """
+    coefs = np.asarray(coefs, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(coefs) == 2:
+        roots = (-(coefs[0] - y) / coefs[1])[:, None].astype(complex)
+    else:
+        companion = np.broadcast_to(
+            P.polycompanion(coefs), (len(y),) + (len(coefs) - 1,) * 2
+        ).copy()
+        companion[:, 0, -1] = 0 - (coefs[0] - y) / coefs[-1]
+        roots = np.linalg.eigvals(companion)
+
+    candidates = np.isclose(roots.imag, 0, atol=1e-8) & (roots.real <= upper[:, None])
+    real = np.where(candidates, roots.real, -np.inf)
+    best = real.max(axis=1)
+    return np.where(candidates.any(axis=1), best, np.nan)
+
+
+@dataclass
+class McCabeThieleBatchResult:
+    """
+    Per-design outcome of McCabeThieleBatch.solve, every field has length N.
+    top/bottom follow McCabeThiele.get_top_coord/get_bottom_coord, and error
+    is the union of the failure masks:
+        pinch : operating line above the isotherm at the inlet
+        overstaged : min reached before the last stage
+        understaged : min not reached after num_stages
+        no_root : no real isotherm root below the inlet concentration
+    kremser marks the designs solved in closed form instead of stepped.
+    """
+
+    top_x: np.ndarray
+    top_y: np.ndarray
+    bottom_x: np.ndarray
+    bottom_y: np.ndarray
+    error: np.ndarray
+    pinch: np.ndarray
+    overstaged: np.ndarray
+    understaged: np.ndarray
+    no_root: np.ndarray
+    kremser: np.ndarray
+
+
+class McCabeThieleBatch:
+    """
+    Steps N McCabe-Thiele staircases on one isotherm together. Design i has the
+    operating line y = slopes[i] * x + intercepts[i] and otherwise the same
+    arguments as McCabeThiele, each one a scalar or a length-N array.
+    """
+
+    ROOT_SOLVERS = ("eigen", "lookup")
+
+    def __init__(
+        self,
+        isotherm_model: IsothermModel,
+        root_solver: str = "eigen",
+        kremser_tolerance: float = None,
+    ) -> None:
+        """
+        root_solver eigen or lookup and kremser_tolerance as in McCabeThiele,
+        designs whose isotherm is that close to a line are solved in closed
+        form, the others stepped
+        """
+        if root_solver not in McCabeThieleBatch.ROOT_SOLVERS:
+            raise ValueError(
+                f"root_solver must be one of {', '.join(McCabeThieleBatch.ROOT_SOLVERS)}"
+            )
+        self.isotherm_poly = isotherm_model.characteristic_poly
+        self.__coefs = np.asarray(self.isotherm_poly.coef, dtype=float)
+        self.__inverse = isotherm_model.inverse() if root_solver == "lookup" else None
+        self.__kremser_tolerance = kremser_tolerance
+
+    def __stage_roots(self, y: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        if self.__inverse is None:
+            return largest_real_roots_below(self.__coefs, y, upper)
+        roots = self.__inverse(y, upper)
+        undecided = np.isnan(roots)
+        if undecided.any():
+            roots[undecided] = largest_real_roots_below(
+                self.__coefs, y[undecided], upper[undecided]
+            )
+        return roots
+
+    def __kremser(
+        self,
+        slopes: np.ndarray,
+        intercepts: np.ndarray,
+        inlet: np.ndarray,
+        stages: np.ndarray,
+        efficiency: np.ndarray,
+        minimum: np.ndarray,
+        rows: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        KremserCascade for rows at once, as McCabeThiele.__kremser: the rows
+        it solves, their bottom x and their error
+        """
+        lowest_root = self.__stage_roots(
+            slopes[rows] * minimum[rows] + intercepts[rows], inlet[rows]
+        )
+        usable = np.isfinite(lowest_root) & (lowest_root < inlet[rows])
+        rows, lowest_root = rows[usable], lowest_root[usable]
+        a, b, linear = linearize_rows(
+            self.isotherm_poly, lowest_root, inlet[rows], self.__kremser_tolerance
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            alpha = 1 - efficiency[rows] * (1 - slopes[rows] / b)
+            fixed_point = efficiency[rows] * (intercepts[rows] - a) / b / (1 - alpha)
+        usable = linear & (alpha > 0) & (alpha < 1) & (inlet[rows] >= minimum[rows])
+        rows, alpha, fixed_point = rows[usable], alpha[usable], fixed_point[usable]
+
+        reaches = fixed_point < minimum[rows]
+        stages_to_min = np.full(len(rows), np.inf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (minimum[rows] - fixed_point) / (inlet[rows] - fixed_point)
+            stages_to_min[reaches] = (
+                np.floor(np.log(ratio[reaches]) / np.log(alpha[reaches])) + 1
+            )
+        bottom_x = np.where(
+            stages_to_min <= stages[rows],
+            minimum[rows],
+            fixed_point + (inlet[rows] - fixed_point) * alpha ** stages[rows],
+        )
+        return rows, bottom_x, stages_to_min
+
+    def solve(
+        self,
+        slopes: np.ndarray,
+        intercepts: np.ndarray,
+        inlet_Uconcentration: np.ndarray,
+        num_stages: np.ndarray,
+        efficiency: np.ndarray,
+        min: np.ndarray = 0,
+    ) -> McCabeThieleBatchResult:
+        slopes, intercepts, inlet, stages, efficiency, minimum = np.broadcast_arrays(
+            *(
+                np.asarray(arg, dtype=float)
+                for arg in (
+                    slopes,
+                    intercepts,
+                    inlet_Uconcentration,
+                    num_stages,
+                    efficiency,
+                    min,
+                )
+            )
+        )
+        stages = stages.astype(int)
+        n = slopes.shape[0]
+
+        top_y = slopes * inlet + intercepts
+        x = inlet.copy()
+        y = top_y.copy()
+
+        pinch = top_y > self.isotherm_poly(inlet)
+        overstaged = np.zeros(n, dtype=bool)
+        no_root = np.zeros(n, dtype=bool)
+        repeat = np.zeros(n, dtype=bool)
+        active = ~pinch
+
+        kremser = np.zeros(n, dtype=bool)
+        if self.__kremser_tolerance is not None:
+            rows, bottom_x, stages_to_min = self.__kremser(
+                slopes,
+                intercepts,
+                inlet,
+                stages,
+                efficiency,
+                minimum,
+                np.flatnonzero(active),
+            )
+            kremser[rows] = True
+            active[rows] = False
+            x[rows] = bottom_x
+            y[rows] = slopes[rows] * bottom_x + intercepts[rows]
+            overstaged[rows] = stages_to_min < stages[rows]
+            # the stepping below marks repeat where min was reached
+            repeat[rows] = stages_to_min <= stages[rows]
+
+        for stage in range(int(stages.max(initial=0))):
+            active &= stage < stages
+            # a design that already hit min on an earlier stage has too many stages
+            overstaged |= active & repeat
+            active &= ~repeat
+            if not active.any():
+                break
+
+            rows = np.flatnonzero(active)
+            roots = self.__stage_roots(y[rows], inlet[rows])
+            missing = np.isnan(roots)
+            no_root[rows[missing]] = True
+            active[rows[missing]] = False
+            rows, roots = rows[~missing], roots[~missing]
+
+            x_new = x[rows] - ((x[rows] - roots) * efficiency[rows])
+            clipped = x_new < minimum[rows]
+            x_new[clipped] = minimum[rows][clipped]
+            repeat[rows[clipped]] = True
+
+            x[rows] = x_new
+            y[rows] = slopes[rows] * x_new + intercepts[rows]
+
+        understaged = ~(pinch | overstaged | no_root) & ~repeat
+        return McCabeThieleBatchResult(
+            top_x=inlet.copy(),
+            top_y=top_y,
+            bottom_x=x,
+            bottom_y=y,
+            error=pinch | overstaged | understaged | no_root,
+            pinch=pinch,
+            overstaged=overstaged,
+            understaged=understaged,
+            no_root=no_root,
+            kremser=kremser,
+        )
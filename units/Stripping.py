@@ -1,15 +1,33 @@
-from copy import deepcopy
-from typing import Dict
+from typing import Dict, Optional
 from units.UnitBaseClass import UnitInterface
-from units.McCabeThiele import McCabeThiele
+from units.McCabeThiele import McCabeThiele, StageCounts
+from units.CascadeSolver import CascadeResult, CounterCurrentCascade
 from models.IsothermModeling import IsothermModel
 from utils.Stream import Stream
+from utils.SpeciesRegistry import SPECIES
 from utils.Components import H2SO4, Water, UO2SO4
 
 from numpy.polynomial import Polynomial
 
+UO2SO4_MASS_FLOW = Stream.accessor("UO2SO4", "mass_flow")
+
 
 class Stripping(UnitInterface):
+    ENGINES = ("staircase", "cascade")
+    PARAMETERS = (
+        "isotherm_model",
+        "stripped_org_Uconc",
+        "loaded_org_Uconc",
+        "num_stages",
+        "efficiency",
+        "OA_ratio",
+        "stripping_agent_molarity",
+        "plot",
+        "root_solver",
+        "engine",
+        "kremser_tolerance",
+    )
+
     def __init__(
         self,
         name: str,
@@ -25,39 +43,62 @@ class Stripping(UnitInterface):
         OA_ratio: float = 3,
         stripping_agent_molarity: float = 0.2,
         plot: bool = False,
+        root_solver: str = "eigen",
+        engine: str = "staircase",
+        kremser_tolerance: float = None,
     ) -> None:
-        super().__init__(name)
+        """
+        engine staircase steps McCabeThiele down to stripped_org_Uconc. engine
+        cascade solves the stages simultaneously, stripped_org_Uconc is then
+        unused and the stripped organic outlet is written from the result,
+        which closes the loop back to Extraction. kremser_tolerance is passed
+        to McCabeThiele for the staircase engine.
+        """
+        super().__init__(
+            name,
+            isotherm_model=isotherm_model,
+            stripped_org_Uconc=stripped_org_Uconc,
+            loaded_org_Uconc=loaded_org_Uconc,
+            num_stages=num_stages,
+            efficiency=efficiency,
+            OA_ratio=OA_ratio,
+            stripping_agent_molarity=stripping_agent_molarity,
+            plot=plot,
+            root_solver=root_solver,
+            engine=engine,
+            kremser_tolerance=kremser_tolerance,
+        )
         self.name = name
-        self.__isotherm_model = isotherm_model
         self.__loaded_organic = loaded_organic
         self.__stripping_agent = stripping_agent
         self.__stripped_organic = stripped_organic
         self.__strip_liquor = strip_liquor
-        self.__stripped_org_Uconc = stripped_org_Uconc
-        self.__loaded_org_Uconc = loaded_org_Uconc
-        self.__num_stages = num_stages
-        self.__efficiency = efficiency
-        self.__OA_ratio = OA_ratio
-        self.__stripping_agent_molarity = stripping_agent_molarity
-        self.__plot = plot
         self.__error = False
+        self.__mcct = None
+
+        self.solve()
 
+    def solve(self) -> None:
+        if self._params["engine"] not in Stripping.ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(Stripping.ENGINES)}")
+        self.__error = False
         self.__size_stripping_agent()
         self.__built_mcct()
         self.__size_strip_liquor()
 
     def __size_stripping_agent(self) -> None:
-        h2so4_vol_percent = self.__stripping_agent_molarity * (
+        h2so4_vol_percent = self._params["stripping_agent_molarity"] * (
             H2SO4.MOLECULAR_WEIGHT / H2SO4.DENSITY
         )
         water_vol_percent = 1 - h2so4_vol_percent
-        strip_volume = self.__loaded_organic.total_volume / self.__OA_ratio
-        self.__stripping_agent.update_components(
-            [
-                Water(strip_volume * water_vol_percent, "volume"),
-                H2SO4(strip_volume * h2so4_vol_percent, "volume"),
-            ]
-        )
+        strip_volume = self.__loaded_organic.total_volume / self._params["OA_ratio"]
+        with self.__stripping_agent.bulk_update(reset=True) as agent:
+            agent.set_component_flow(
+                Water.NAME, strip_volume * water_vol_percent, "volume"
+            )
+            agent.set_component_flow(
+                H2SO4.NAME, strip_volume * h2so4_vol_percent, "volume"
+            )
         # print(
         #     f'checking molarity SA : {self.__stripping_agent.get_component_property("H2SO4", "molar_flow")/(self.__stripping_agent.total_volume*1000)}'
         # )
@@ -65,24 +106,68 @@ class Stripping(UnitInterface):
         #     f"checking volume : {self.__stripping_agent.total_volume/self.__loaded_organic.total_volume}"
         # )
 
+    def __operating_line(self) -> Polynomial:
+        return Polynomial(
+            [
+                -(self._params["OA_ratio"] * self._params["stripped_org_Uconc"]),  # b
+                self._params["OA_ratio"],  # m
+            ]
+        )
+
+    def __mcct_for(self, num_stages: Optional[int], plot: bool) -> McCabeThiele:
+        return McCabeThiele(
+            self._params["isotherm_model"],
+            operating_line=self.__operating_line(),
+            inlet_Uconcentration=self._params["loaded_org_Uconc"],
+            num_stages=num_stages,
+            efficiency=self._params["efficiency"],
+            plot=plot,
+            root_solver=self._params["root_solver"],
+            min=self._params["stripped_org_Uconc"],
+            kremser_tolerance=self._params["kremser_tolerance"],
+        )
+
     def __built_mcct(self) -> None:
-        self.__mcct = McCabeThiele(
-            self.__isotherm_model,
-            operating_line=Polynomial(
-                [
-                    -(self.__OA_ratio * self.__stripped_org_Uconc),  # b
-                    self.__OA_ratio,  # m
-                ]
-            ),
-            inlet_Uconcentration=self.__loaded_org_Uconc,
-            num_stages=self.__num_stages,
-            efficiency=self.__efficiency,
-            plot=self.__plot,
-            min=self.__stripped_org_Uconc,
+        if self._params["engine"] == "cascade":
+            self.profile = self.cascade()
+            # the stripping isotherm fit is above 0 at x = 0, so against fresh
+            # acid the last stage may only close below x = 0, which must not
+            # reach the stripped organic recycled to Extraction
+            if not self.profile.ok[0]:
+                self.__error = True
+                return
+            self.__top = [
+                self._params["loaded_org_Uconc"],
+                float(self.profile.outlet_y[0]),
+            ]
+            self.__bottom = [
+                float(self.profile.outlet_x[0]),
+                float(self.profile.y[0, -1]),
+            ]
+            return
+        mcct_key = (
+            self._params["isotherm_model"],
+            self._params["efficiency"],
+            self._params["root_solver"],
+            self._params["kremser_tolerance"],
         )
+        plot = self._params["plot"]
+        if self.__mcct is not None and not plot and self.__mcct_key == mcct_key:
+            # same isotherm and stages, only the design changed
+            self.__mcct.solve(
+                operating_line=self.__operating_line(),
+                inlet_Uconcentration=self._params["loaded_org_Uconc"],
+                num_stages=self._params["num_stages"],
+                min=self._params["stripped_org_Uconc"],
+            )
+        else:
+            self.__mcct = self.__mcct_for(self._params["num_stages"], plot)
+            self.__mcct_key = mcct_key
         if self.__mcct.error:
             self.__error = True
             return
+        self.__top = self.__mcct.get_top_coord()
+        self.__bottom = self.__mcct.get_bottom_coord()
 
         # print("\nAqeous State")
         # print(f"Strip Liquor : {self.__mcct.get_top_coord()[1]}")
@@ -94,16 +179,21 @@ class Stripping(UnitInterface):
     def __size_strip_liquor(self) -> None:
         if self.__error:
             return
-        strip_liq_comps = deepcopy(self.__stripping_agent.components)
-        uo2so4_mass = self.__loaded_organic.get_component_property(
-            "UO2SO4", "mass_flow"
-        ) - self.__stripped_organic.get_component_property("UO2SO4", "mass_flow")
-        strip_liq_comps.append(UO2SO4(uo2so4_mass, "mass"))
-        self.__strip_liquor.update_components(strip_liq_comps)
+        if self._params["engine"] == "cascade":
+            uo2so4_stripped = (
+                self.__bottom[0] * self.__loaded_organic.total_volume
+            ) / 0.6502
+            self.__loaded_organic.derive(
+                self.__stripped_organic, {UO2SO4.NAME: uo2so4_stripped}
+            )
+        uo2so4_mass = UO2SO4_MASS_FLOW(self.__loaded_organic) - UO2SO4_MASS_FLOW(
+            self.__stripped_organic
+        )
+        self.__stripping_agent.derive(self.__strip_liquor, {UO2SO4.NAME: uo2so4_mass})
         self.mass_balance_check()
 
     def get_strip_concentration(self) -> float:
-        return self.__mcct.get_top_coord()[1]
+        return self.__top[1]
 
     def error(self):
         return self.__error
@@ -125,7 +215,38 @@ class Stripping(UnitInterface):
             raise ValueError("Failed Mass Balance on Strippping")
     
     def stripping_per_stage(self) -> float:
-        return (self.__mcct.get_top_coord()[0] - self.__mcct.get_bottom_coord()[0]) / self.__num_stages
+        return (self.__top[0] - self.__bottom[0]) / self._params["num_stages"]
+
+    def stage_counts(self, max_stages: int, target: float = None) -> StageCounts:
+        """
+        Feasibility, stripped organic and per-stage stripping of every stage
+        count 1..max_stages from a single staircase pass, stopping early once
+        the stripped organic gets down to target. The strip liquor does not
+        depend on the stage count, only whether it is feasible does.
+        """
+        return self.__mcct_for(None, False).stage_counts(max_stages, target)
+
+    def cascade(self) -> CascadeResult:
+        """
+        Stage profiles of this stripping solved simultaneously, from the loaded
+        organic and the stripping agent as sized, without assuming the
+        stripped organic concentration. outlet_x is then the stripped organic
+        the stages actually reach.
+        """
+        agent_volume = self.__stripping_agent.total_volume
+        # the agent is sized as fresh acid, it only carries uranium if recycled
+        agent_Uconc = (
+            (UO2SO4_MASS_FLOW(self.__stripping_agent) * 0.6502) / agent_volume
+            if self.__stripping_agent.present[SPECIES.index(UO2SO4.NAME)]
+            else 0.0
+        )
+        return CounterCurrentCascade(self._params["isotherm_model"]).solve(
+            feed=self._params["loaded_org_Uconc"],
+            solvent=agent_Uconc,
+            flow_ratio=self.__loaded_organic.total_volume / agent_volume,
+            num_stages=self._params["num_stages"],
+            efficiency=self._params["efficiency"],
+        )
 
     def get_operating_conditions(self) -> Dict[str, float]:
         pass
@@ -1,10 +1,32 @@
-from typing import Dict
+from typing import Any, Dict, Tuple
 from abc import ABC, abstractmethod
 
 
 class UnitInterface(ABC):
-    def __init__(self, name: str) -> None:
+    # keyword arguments of __init__ that configure may change, streams excluded
+    PARAMETERS: Tuple[str, ...] = ()
+
+    def __init__(self, name: str, **params) -> None:
         self.name = name
+        # PARAMETERS as last configured, what solve() reads
+        self._params: Dict[str, Any] = {}
+        self.configure(**params)
+
+    def configure(self, **params) -> "UnitInterface":
+        """
+        Change parameters for the next solve(), so one unit and its streams can
+        be solved for many parameter sets
+        """
+        for key in params:
+            if key not in self.PARAMETERS:
+                raise TypeError(f"{type(self).__name__} has no parameter {key}")
+        self._params.update(params)
+        return self
+
+    @abstractmethod
+    def solve(self) -> None:
+        """Compute the outlet streams from the inlets and the parameters"""
+        pass
 
     @abstractmethod
     def get_operating_conditions(self) -> Dict[str, float]:
@@ -5,6 +5,16 @@ class Component:
     vol_flow in m^3/hr
     """
 
+    __slots__ = (
+        "name",
+        "molecular_weight",
+        "has_volume",
+        "density",
+        "mass_flow",
+        "mol_flow",
+        "vol_flow",
+    )
+
     def __init__(
         self,
         name: str,
@@ -31,6 +41,19 @@ class Component:
 
         self.update_flow(flow_rate, flow_type)
 
+    @classmethod
+    def from_state(cls, mass_flow: float, mol_flow: float, vol_flow: float):
+        """Build a component from already consistent flows without recomputing them."""
+        component = cls.__new__(cls)
+        component.name = cls.NAME
+        component.molecular_weight = cls.MOLECULAR_WEIGHT
+        component.has_volume = cls.HAS_VOLUME
+        component.density = cls.DENSITY
+        component.mass_flow = mass_flow
+        component.mol_flow = mol_flow
+        component.vol_flow = vol_flow
+        return component
+
     def update_flow(self, new_flow_rate, flow_type="mass"):
         """
         Update the component's flow rate.
@@ -82,220 +105,265 @@ class Component:
 
 
 class Water(Component):
+    __slots__ = ()
+    NAME = "Water"
     MOLECULAR_WEIGHT = 18.015  # g/mol
     DENSITY = 1000  # kg/m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Water",
+            name=Water.NAME,
             molecular_weight=Water.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=Water.HAS_VOLUME,
             density=Water.DENSITY,
         )
 
 
 class H2SO4(Component):
+    __slots__ = ()
+    NAME = "H2SO4"
     MOLECULAR_WEIGHT = 98.079  # g/mol
     DENSITY = 1830  # kg/m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="H2SO4",
+            name=H2SO4.NAME,
             molecular_weight=H2SO4.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=H2SO4.HAS_VOLUME,
             density=H2SO4.DENSITY,
         )
 
 
 class Cyanex923(Component):
     # https://www.biosynth.com/p/FC168194/100786-00-3-cyanex-923
+    __slots__ = ()
+    NAME = "Cyanex923"
     MOLECULAR_WEIGHT = 689.11  # g/mol
     DENSITY = 880  # kg/m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Cyanex923",
+            name=Cyanex923.NAME,
             molecular_weight=Cyanex923.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=Cyanex923.HAS_VOLUME,
             density=Cyanex923.DENSITY,
         )
 
 
 class Isodecanol(Component):
     # https://pubchem.ncbi.nlm.nih.gov/compound/Isodecanol#section=Density
+    __slots__ = ()
+    NAME = "Isodecanol"
     MOLECULAR_WEIGHT = 158.28  # g/mol
     DENSITY = 840  # kg/m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Isodecanol",
+            name=Isodecanol.NAME,
             molecular_weight=Isodecanol.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=Isodecanol.HAS_VOLUME,
             density=Isodecanol.DENSITY,
         )
 
 
 class ShellSolD70(Component):
+    __slots__ = ()
+    NAME = "ShellSolD70"
     MOLECULAR_WEIGHT = 174  # g/mol
     DENSITY = 796  # kg/m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="ShellSolD70",
+            name=ShellSolD70.NAME,
             molecular_weight=ShellSolD70.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=ShellSolD70.HAS_VOLUME,
             density=ShellSolD70.DENSITY,
         )
 
 
 class UO2_2p(Component):
+    __slots__ = ()
+    NAME = "UO2_2p"
     MOLECULAR_WEIGHT = 270.03  # g/mol
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="UO2_2p",
+            name=UO2_2p.NAME,
             molecular_weight=UO2_2p.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=UO2_2p.HAS_VOLUME,
             density=UO2_2p.DENSITY,
         )
 
 
 class H2SO5(Component):
+    __slots__ = ()
+    NAME = "H2SO5"
     MOLECULAR_WEIGHT = 114.078
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="H2SO5",
+            name=H2SO5.NAME,
             molecular_weight=H2SO5.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=H2SO5.HAS_VOLUME,
             density=H2SO5.DENSITY,
         )
 
 
 class SO4_2m(Component):
+    __slots__ = ()
+    NAME = "SO4(2-)"
     MOLECULAR_WEIGHT = 96.06
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="SO4(2-)",
+            name=SO4_2m.NAME,
             molecular_weight=SO4_2m.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=SO4_2m.HAS_VOLUME,
             density=SO4_2m.DENSITY,
         )
 
 
 class H_1p(Component):
+    __slots__ = ()
+    NAME = "H(+)"
     MOLECULAR_WEIGHT = 1.01
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="H(+)",
+            name=H_1p.NAME,
             molecular_weight=H_1p.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=H_1p.HAS_VOLUME,
             density=H_1p.DENSITY,
         )
 
 
 class Mg(Component):
+    __slots__ = ()
+    NAME = "Mg"
     MOLECULAR_WEIGHT = 24.305
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Mg",
+            name=Mg.NAME,
             molecular_weight=Mg.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=Mg.HAS_VOLUME,
             density=Mg.DENSITY,
         )
 
 
 class Fe(Component):
+    __slots__ = ()
+    NAME = "Fe"
     MOLECULAR_WEIGHT = 55.845
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Fe",
+            name=Fe.NAME,
             molecular_weight=Fe.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=Fe.HAS_VOLUME,
             density=Fe.DENSITY,
         )
 
 
 class SiO2(Component):
+    __slots__ = ()
+    NAME = "SiO2"
     MOLECULAR_WEIGHT = 60.08
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="SiO2",
+            name=SiO2.NAME,
             molecular_weight=SiO2.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=SiO2.HAS_VOLUME,
             density=SiO2.DENSITY,
         )
 
 
 class Al2SiO5(Component):
+    __slots__ = ()
+    NAME = "Al2SiO5"
     MOLECULAR_WEIGHT = 162.05
     DENSITY = None
+    HAS_VOLUME = False
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="Al2SiO5",
+            name=Al2SiO5.NAME,
             molecular_weight=Al2SiO5.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=Al2SiO5.HAS_VOLUME,
             density=Al2SiO5.DENSITY,
         )
 
 
 class UO2SO4(Component):
+    __slots__ = ()
+    NAME = "UO2SO4"
     MOLECULAR_WEIGHT = 366.09
     DENSITY = 3280  # kg /m^3
+    HAS_VOLUME = True
 
     def __init__(self, flow_rate, flow_type="mass"):
         super().__init__(
-            name="UO2SO4",
+            name=UO2SO4.NAME,
             molecular_weight=UO2SO4.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=True,
+            has_volume=UO2SO4.HAS_VOLUME,
             density=UO2SO4.DENSITY,
         )
 
 
 class MN2_1p(Component):
+    __slots__ = ()
+    NAME = "MN2(+)"
     MOLECULAR_WEIGHT = 109.88  # g/ mol
     DENSITY = None  # kg /m^3
+    HAS_VOLUME = False
 
     def __init__(
         self,
@@ -303,18 +371,21 @@ class MN2_1p(Component):
         flow_type: str = "mass",
     ):
         super().__init__(
-            name="MN2(+)",
+            name=MN2_1p.NAME,
             molecular_weight=MN2_1p.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=MN2_1p.HAS_VOLUME,
             density=MN2_1p.DENSITY,
         )
 
 
 class Al_3p(Component):
+    __slots__ = ()
+    NAME = "Al(3+)"
     MOLECULAR_WEIGHT = 26.98  # g/ mol
     DENSITY = None  # kg /m^3
+    HAS_VOLUME = False
 
     def __init__(
         self,
@@ -322,10 +393,10 @@ class Al_3p(Component):
         flow_type: str = "mass",
     ):
         super().__init__(
-            name="Al(3+)",
+            name=Al_3p.NAME,
             molecular_weight=Al_3p.MOLECULAR_WEIGHT,
             flow_rate=flow_rate,
             flow_type=flow_type,
-            has_volume=False,
+            has_volume=Al_3p.HAS_VOLUME,
             density=Al_3p.DENSITY,
         )
@@ -0,0 +1,316 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from units.UnitBaseClass import UnitInterface
+from utils.RecycleSolver import RecycleResult, RecycleSolver
+from utils.Stream import Stream
+
+
+@dataclass(frozen=True)
+class UnitRef:
+    """
+    A unit parameter taken from another unit once that one has run, e.g.
+    UnitRef("Extraction", "loaded_org_Uconc"). Methods are called.
+    """
+
+    unit: str
+    attribute: str
+
+
+@dataclass
+class UnitSpec:
+    unit_class: Type[UnitInterface]
+    streams: Dict[str, int]
+    params: Dict[str, Any]
+
+
+@dataclass
+class FlowsheetResult:
+    """
+    order : calculation blocks, a single unit or the units of one recycle loop
+    tears : stream numbers torn to converge the loops
+    recycles : RecycleSolver outcome per loop, keyed by its first unit
+    failed_unit : the unit that reported an error, None if all ran
+    solved / reused : per unit, how many evaluations built the unit and how
+                      many were skipped as its inputs had not changed
+    """
+
+    order: List[List[str]]
+    tears: List[int]
+    recycles: Dict[str, RecycleResult] = field(default_factory=dict)
+    failed_unit: Optional[str] = None
+    solved: Dict[str, int] = field(default_factory=dict)
+    reused: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def reused_units(self) -> List[str]:
+        """Units that were not solved at all on this run"""
+        return [name for name in self.reused if name not in self.solved]
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_unit is None and all(
+            recycle.converged for recycle in self.recycles.values()
+        )
+
+
+class Flowsheet:
+    """
+    Sequential modular solve of units wired by streams. Units are registered as
+    specs (class, stream keyword arguments by stream number, parameters),
+    built in calculation order on the first run() and re-solved in place
+    with configure() and solve() after that. The order comes from the strongly connected components of the
+    unit graph: stream edges from origin to destination plus UnitRef
+    dependencies. Every loop gets tear streams, recycle flagged ones first and
+    then the highest numbered stream on a remaining cycle, and is converged
+    with RecycleSolver.
+
+    With incremental, a unit is only rebuilt when its fingerprint, the state of
+    its inlet streams and its resolved parameters, differs from its last
+    build. Otherwise every stream it touches is restored from that build, so
+    a changed parameter only costs the units downstream of it.
+    """
+
+    def __init__(self, incremental: bool = True) -> None:
+        self.streams: Dict[int, Stream] = {}
+        self.specs: Dict[str, UnitSpec] = {}
+        self.units: Dict[str, UnitInterface] = {}
+        self.incremental = incremental
+        # unit name : (fingerprints, failed, stream snapshots after the build)
+        self.__builds: Dict[str, Tuple[tuple, bool, list]] = {}
+        # calculation order and tears, until the wiring changes
+        self.__order: Optional[Tuple[List[List[str]], List[int]]] = None
+
+    def add_stream(self, stream: Stream) -> Stream:
+        if stream.stream_number in self.streams:
+            raise ValueError(f"Stream {stream.stream_number} is already registered")
+        self.streams[stream.stream_number] = stream
+        self.__order = None
+        return stream
+
+    def add_unit(
+        self,
+        name: str,
+        unit_class: Type[UnitInterface],
+        streams: Dict[str, int],
+        **params,
+    ) -> None:
+        """streams maps the unit's stream arguments to registered stream numbers"""
+        if name in self.specs:
+            raise ValueError(f"Unit {name} is already registered")
+        for number in streams.values():
+            if number not in self.streams:
+                raise ValueError(f"Stream {number} of unit {name} is not registered")
+        self.specs[name] = UnitSpec(unit_class, dict(streams), params)
+        self.__order = None
+
+    def set_params(self, name: str, **params) -> None:
+        """Change parameters of a registered unit, e.g. for a what-if study"""
+        current = self.specs[name].params
+        if any(
+            isinstance(value, UnitRef) or isinstance(current.get(arg), UnitRef)
+            for arg, value in params.items()
+        ):
+            self.__order = None
+        current.update(params)
+
+    def invalidate(self, name: str = None) -> None:
+        """Forget the last build of one unit, or of all units"""
+        if name is None:
+            self.__builds.clear()
+        else:
+            self.__builds.pop(name, None)
+
+    def graph(self):
+        """
+        MultiDiGraph of the units. Edges carry the stream number in "stream",
+        None for a UnitRef dependency.
+        """
+        import networkx as nx
+
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(self.specs)
+        wired = set()
+        for spec in self.specs.values():
+            wired.update(spec.streams.values())
+        for number in sorted(wired):
+            stream = self.streams[number]
+            if stream.origin in self.specs and stream.destination in self.specs:
+                G.add_edge(stream.origin, stream.destination, stream=number)
+        for name, spec in self.specs.items():
+            for value in spec.params.values():
+                if isinstance(value, UnitRef):
+                    G.add_edge(value.unit, name, stream=None)
+        return G
+
+    def seed_calculation_order(self, order: List[List[str]], tears: List[int]) -> None:
+        """
+        Use an order worked out before for this same wiring, e.g. by
+        FlowsheetTemplate.compile, instead of deriving it on the first run.
+        Changing the wiring afterwards derives it again as usual.
+        """
+        self.__order = ([list(block) for block in order], list(tears))
+
+    def calculation_order(self) -> Tuple[List[List[str]], List[int]]:
+        """Calculation blocks in order and the streams torn inside them"""
+        if self.__order is None:
+            self.__order = self.__calculation_order()
+        return self.__order
+
+    def __calculation_order(self) -> Tuple[List[List[str]], List[int]]:
+        import networkx as nx
+
+        G = self.graph()
+        condensed = nx.condensation(G)
+        order, tears = [], []
+        for component in nx.topological_sort(condensed):
+            members = condensed.nodes[component]["members"]
+            block = G.subgraph(members).copy()
+            block_tears = self.__choose_tears(block)
+            Flowsheet.__remove_streams(block, block_tears)
+            order.append(list(nx.topological_sort(block)))
+            tears.extend(block_tears)
+        return order, tears
+
+    def __choose_tears(self, block) -> List[int]:
+        import networkx as nx
+
+        tears = []
+        block = block.copy()
+        while True:
+            try:
+                cycle = nx.find_cycle(block)
+            except nx.NetworkXNoCycle:
+                return tears
+            candidates = [
+                block.edges[u, v, key]["stream"]
+                for u, v, key in cycle
+                if block.edges[u, v, key]["stream"] is not None
+            ]
+            if not candidates:
+                raise ValueError(
+                    "Units depend on each other's results without a stream to tear"
+                )
+            tear = max(
+                candidates,
+                key=lambda number: (self.streams[number].recycle, number),
+            )
+            tears.append(tear)
+            Flowsheet.__remove_streams(block, [tear])
+
+    @staticmethod
+    def __remove_streams(block, numbers: List[int]) -> None:
+        block.remove_edges_from(
+            [
+                (u, v, key)
+                for u, v, key, number in block.edges(keys=True, data="stream")
+                if number in numbers
+            ]
+        )
+
+    def run(
+        self,
+        method: str = "wegstein",
+        tolerance: float = 1e-8,
+        max_iterations: int = 100,
+    ) -> FlowsheetResult:
+        order, tears = self.calculation_order()
+        result = FlowsheetResult(order=order, tears=tears)
+        for block in order:
+            block_tears = [
+                self.streams[number]
+                for number in tears
+                if self.streams[number].origin in block
+            ]
+            if not block_tears:
+                if not self.__run_units(block, result):
+                    return result
+                continue
+
+            for stream in block_tears:
+                stream.recycle = True
+            recycle = RecycleSolver(
+                block_tears,
+                lambda: self.__run_units(block, result),
+                method=method,
+                tolerance=tolerance,
+                max_iterations=max_iterations,
+            ).solve()
+            result.recycles[block[0]] = recycle
+            if not recycle.converged:
+                return result
+        return result
+
+    def __run_units(self, names: List[str], result: FlowsheetResult) -> bool:
+        for name in names:
+            if not self.__run_unit(name, result):
+                result.failed_unit = name
+                return False
+        result.failed_unit = None
+        return True
+
+    def __run_unit(self, name: str, result: FlowsheetResult) -> bool:
+        """Build the unit, or restore its last build, False if it failed"""
+        spec = self.specs[name]
+        streams = {arg: self.streams[n] for arg, n in spec.streams.items()}
+        params = {arg: self.__resolve(value) for arg, value in spec.params.items()}
+
+        if self.incremental:
+            before = self.__fingerprint(name, streams, params)
+            build = self.__builds.get(name)
+            if build is not None and before in build[0]:
+                for stream, (flows, present) in zip(streams.values(), build[2]):
+                    np.copyto(stream.flows, flows)
+                    np.copyto(stream.present, present)
+                    stream.mark_dirty()
+                result.reused[name] = result.reused.get(name, 0) + 1
+                return not build[1]
+
+        unit = self.units.get(name)
+        if type(unit) is spec.unit_class:
+            # streams are fixed per spec, only the parameters can have changed
+            unit.configure(**params).solve()
+        else:
+            unit = spec.unit_class(name=name, **streams, **params)
+            self.units[name] = unit
+        result.solved[name] = result.solved.get(name, 0) + 1
+        error = getattr(unit, "error", None)
+        failed = callable(error) and error()
+        if self.incremental:
+            # units that size their own inlets (PLSMixer's acid) leave them in
+            # a state they reproduce, so that state matches the build too
+            after = self.__fingerprint(name, streams, params)
+            self.__builds[name] = (
+                (before, after),
+                failed,
+                [(s.flows.copy(), s.present.copy()) for s in streams.values()],
+            )
+        return not failed
+
+    @staticmethod
+    def __fingerprint(name: str, streams: Dict[str, Stream], params: Dict) -> tuple:
+        inlets = tuple(
+            (arg, stream.flows.tobytes(), stream.present.tobytes())
+            for arg, stream in streams.items()
+            if stream.destination == name
+        )
+        values = tuple(
+            (
+                arg,
+                (
+                    value
+                    if isinstance(value, (bool, int, float, str, type(None)))
+                    else ("object", id(value))
+                ),
+            )
+            for arg, value in sorted(params.items())
+        )
+        return inlets, values
+
+    def __resolve(self, value: Any) -> Any:
+        if not isinstance(value, UnitRef):
+            return value
+        attribute = getattr(self.units[value.unit], value.attribute)
+        return attribute() if callable(attribute) else attribute
@@ -0,0 +1,278 @@
+import importlib
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Tuple, Type
+
+import numpy as np
+
+from models import IsothermModeling
+from models.IsothermModeling import IsothermModel
+from units.UnitBaseClass import UnitInterface
+from utils.Flowsheet import Flowsheet, FlowsheetResult, UnitRef
+from utils.SpeciesRegistry import SPECIES
+from utils.Stream import Stream, StreamBatch
+
+
+@dataclass(frozen=True)
+class CompiledUnit:
+    name: str
+    unit_class: Type[UnitInterface]
+    # unit stream argument : slot of the stream in CompiledFlowsheet.flows
+    stream_slots: Tuple[Tuple[str, int], ...]
+    params: Tuple[Tuple[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class CompiledFlowsheet:
+    """
+    A FlowsheetTemplate resolved once: species rows, unit classes, isotherm
+    models and the calculation order are looked up at compile time, so an
+    evaluation only copies the initial stream arrays and runs the units.
+
+    flows / present : (n_streams, n_species, 3) / (n_streams, n_species)
+                      initial state of every stream slot, read only
+    inputs : input name : (unit, parameter) it sets
+    compile_seconds : wall time of FlowsheetTemplate.compile
+    """
+
+    stream_numbers: Tuple[int, ...]
+    # (origin, destination, recycle) per stream slot
+    routes: Tuple[Tuple[str, str, bool], ...]
+    flows: np.ndarray
+    present: np.ndarray
+    units: Tuple[CompiledUnit, ...]
+    inputs: Dict[str, Tuple[str, str]]
+    order: Tuple[Tuple[str, ...], ...]
+    tears: Tuple[int, ...]
+    compile_seconds: float
+
+    def instance(self, incremental: bool = True) -> "FlowsheetInstance":
+        return FlowsheetInstance(self, incremental)
+
+    def batch(self, size: int, dtype: np.dtype = np.float64) -> Dict[int, StreamBatch]:
+        """size copies of every stream's initial state, for the batch solvers"""
+        batches = {}
+        for slot, number in enumerate(self.stream_numbers):
+            origin, destination, recycle = self.routes[slot]
+            batch = StreamBatch(
+                number, origin, destination, size, dtype=dtype, recycle=recycle
+            )
+            batch.flows[:] = self.flows[slot]
+            batch.present[:] = self.present[slot]
+            batches[number] = batch
+        return batches
+
+
+class FlowsheetInstance:
+    """
+    One evaluable copy of a CompiledFlowsheet. evaluate() resets every stream
+    to its initial state with array copies and re-solves the units in place,
+    so an instance is built once and evaluated many times. Its Flowsheet runs
+    in the compiled order, it is not derived again.
+    """
+
+    def __init__(self, compiled: CompiledFlowsheet, incremental: bool = True) -> None:
+        self.compiled = compiled
+        self.flowsheet = Flowsheet(incremental=incremental)
+        self.streams: Dict[int, Stream] = {}
+        for number, (origin, destination, recycle) in zip(
+            compiled.stream_numbers, compiled.routes
+        ):
+            self.streams[number] = self.flowsheet.add_stream(
+                Stream(number, origin, destination, recycle=recycle)
+            )
+        for unit in compiled.units:
+            self.flowsheet.add_unit(
+                unit.name,
+                unit.unit_class,
+                {arg: compiled.stream_numbers[slot] for arg, slot in unit.stream_slots},
+                **dict(unit.params),
+            )
+        if compiled.order:
+            self.flowsheet.seed_calculation_order(compiled.order, compiled.tears)
+        self.reset()
+
+    @property
+    def units(self) -> Dict[str, UnitInterface]:
+        return self.flowsheet.units
+
+    def reset(self) -> None:
+        for slot, stream in enumerate(self.streams.values()):
+            np.copyto(stream.flows, self.compiled.flows[slot])
+            np.copyto(stream.present, self.compiled.present[slot])
+            stream.recycle = self.compiled.routes[slot][2]
+            stream.mark_dirty()
+
+    def evaluate(self, **inputs) -> FlowsheetResult:
+        """Solve from the initial streams with inputs set, see CompiledFlowsheet.inputs"""
+        self.reset()
+        for key, value in inputs.items():
+            if key not in self.compiled.inputs:
+                raise TypeError(f"Flowsheet template has no input {key}")
+            unit, param = self.compiled.inputs[key]
+            self.flowsheet.set_params(unit, **{param: value})
+        return self.flowsheet.run()
+
+
+class FlowsheetTemplate:
+    """
+    Declaration of a flowsheet, from Python with add_stream / add_unit / add_input
+    or from a JSON file, compiled once into a CompiledFlowsheet.
+
+    In JSON, a stream lists its components as {name: mass flow}, a unit names
+    its class by module path, e.g. "units.Extraction.Extraction", and a
+    parameter may be {"isotherm": "EXTRACTION_ISOTHERM"} for the shared
+    IsothermModel of that configuration in models.IsothermModeling, or
+    {"unit_ref": [unit, attribute]} for a UnitRef.
+    """
+
+    def __init__(self) -> None:
+        self.streams: List[Dict[str, Any]] = []
+        self.units: List[Dict[str, Any]] = []
+        self.inputs: Dict[str, Tuple[str, str]] = {}
+
+    @classmethod
+    def from_json(cls, path: str) -> "FlowsheetTemplate":
+        with open(path, "r") as fp:
+            spec = json.load(fp)
+        template = cls()
+        for stream in spec["streams"]:
+            template.add_stream(**stream)
+        for unit in spec["units"]:
+            template.add_unit(
+                unit["name"], unit["class"], unit["streams"], **unit.get("params", {})
+            )
+        for name, (unit, param) in spec.get("inputs", {}).items():
+            template.add_input(name, unit, param)
+        return template
+
+    def add_stream(
+        self,
+        stream_number: int,
+        origin: str,
+        destination: str,
+        components: Dict[str, float] = None,
+        recycle: bool = False,
+    ) -> None:
+        """components maps species names to mass flows"""
+        self.streams.append(
+            {
+                "stream_number": stream_number,
+                "origin": origin,
+                "destination": destination,
+                "components": dict(components or {}),
+                "recycle": recycle,
+            }
+        )
+
+    def add_unit(
+        self, name: str, unit_class: Any, streams: Dict[str, int], **params
+    ) -> None:
+        """unit_class is a UnitInterface subclass or its dotted module path"""
+        self.units.append(
+            {
+                "name": name,
+                "class": unit_class,
+                "streams": dict(streams),
+                "params": params,
+            }
+        )
+
+    def add_input(self, name: str, unit: str, param: str) -> None:
+        """Expose a unit parameter to FlowsheetInstance.evaluate under name"""
+        self.inputs[name] = (unit, param)
+
+    def compile(self) -> CompiledFlowsheet:
+        start = time.perf_counter()
+        numbers = tuple(stream["stream_number"] for stream in self.streams)
+        slots = {number: slot for slot, number in enumerate(numbers)}
+        if len(slots) != len(numbers):
+            raise ValueError("Stream numbers must be unique in a flowsheet template")
+
+        flows = np.zeros((len(numbers), SPECIES.size, 3))
+        present = np.zeros((len(numbers), SPECIES.size), dtype=bool)
+        for slot, stream in enumerate(self.streams):
+            for component_name, mass_flow in stream["components"].items():
+                idx = SPECIES.index(component_name)
+                flows[slot, idx] = SPECIES.flow_row(idx, mass_flow, "mass")
+                present[slot, idx] = True
+        flows.flags.writeable = False
+        present.flags.writeable = False
+
+        units = []
+        for unit in self.units:
+            unit_class = FlowsheetTemplate.__resolve_class(unit["class"])
+            for param in unit["params"]:
+                if param not in unit_class.PARAMETERS:
+                    raise ValueError(f"{unit['name']} has no parameter {param}")
+            try:
+                stream_slots = tuple(
+                    (arg, slots[number]) for arg, number in unit["streams"].items()
+                )
+            except KeyError as missing:
+                raise ValueError(
+                    f"Stream {missing} of unit {unit['name']} is not in the template"
+                ) from None
+            units.append(
+                CompiledUnit(
+                    name=unit["name"],
+                    unit_class=unit_class,
+                    stream_slots=stream_slots,
+                    params=tuple(
+                        (param, FlowsheetTemplate.__resolve_param(value))
+                        for param, value in unit["params"].items()
+                    ),
+                )
+            )
+        names = {unit.name for unit in units}
+        for name, (unit, param) in self.inputs.items():
+            if unit not in names:
+                raise ValueError(f"Input {name} refers to unknown unit {unit}")
+
+        compiled = CompiledFlowsheet(
+            stream_numbers=numbers,
+            routes=tuple(
+                (stream["origin"], stream["destination"], stream["recycle"])
+                for stream in self.streams
+            ),
+            flows=flows,
+            present=present,
+            units=tuple(units),
+            inputs=dict(self.inputs),
+            order=(),
+            tears=(),
+            compile_seconds=0.0,
+        )
+        # the order only depends on the wiring, check it once here
+        order, tears = compiled.instance(
+            incremental=False
+        ).flowsheet.calculation_order()
+        return replace(
+            compiled,
+            order=tuple(tuple(block) for block in order),
+            tears=tuple(tears),
+            compile_seconds=time.perf_counter() - start,
+        )
+
+    @staticmethod
+    def __resolve_class(unit_class: Any) -> Type[UnitInterface]:
+        if isinstance(unit_class, str):
+            module_name, _, class_name = unit_class.rpartition(".")
+            unit_class = getattr(importlib.import_module(module_name), class_name)
+        if not (isinstance(unit_class, type) and issubclass(unit_class, UnitInterface)):
+            raise ValueError(f"{unit_class} is not a unit class")
+        return unit_class
+
+    @staticmethod
+    def __resolve_param(value: Any) -> Any:
+        if not isinstance(value, dict):
+            return value
+        if "isotherm" in value:
+            isotherm = value["isotherm"]
+            if isinstance(isotherm, str):
+                isotherm = getattr(IsothermModeling, isotherm)
+            return IsothermModel.get(**isotherm)
+        if "unit_ref" in value:
+            return UnitRef(*value["unit_ref"])
+        return value
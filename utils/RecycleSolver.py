@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from utils.SpeciesRegistry import SPECIES
+from utils.Stream import Stream
+
+
+@dataclass
+class RecycleResult:
+    """
+    converged : the tear stream stopped changing within tolerance
+    failed : run reported an infeasible unit, the loop was abandoned
+    history : norm of the change in the tear's mass flows per iteration
+    """
+
+    converged: bool
+    failed: bool
+    iterations: int
+    history: List[float] = field(default_factory=list)
+
+
+class RecycleSolver:
+    """
+    Closes a recycle loop on one or more tear streams. run evaluates the loop
+    once: the units read the tear streams, and the units producing them write
+    the new tear streams in place. run may return False to abandon an
+    infeasible loop.
+
+    The tears' mass flows are iterated to a fixed point with
+        substitution : next guess = what the loop produced
+        wegstein : per species secant extrapolation, q bounded to wegstein_bounds
+        broyden : quasi-Newton on g(x) - x with Broyden's inverse Jacobian update
+    and convergence is Stream.are_equal on two successive mass flow vectors.
+    wegstein and broyden can extrapolate a flow below zero, their guesses are
+    clipped at zero so no unit is fed a negative flow.
+    """
+
+    METHODS = ("substitution", "wegstein", "broyden")
+
+    def __init__(
+        self,
+        tear: Union[Stream, Sequence[Stream]],
+        run: Callable[[], Optional[bool]],
+        method: str = "wegstein",
+        tolerance: float = 1e-8,
+        max_iterations: int = 100,
+        wegstein_bounds: tuple = (-5.0, 0.0),
+    ) -> None:
+        self.tears = [tear] if isinstance(tear, Stream) else list(tear)
+        for stream in self.tears:
+            if not stream.recycle:
+                raise ValueError(
+                    f"Stream {stream.stream_number} is not flagged as a recycle stream"
+                )
+        if method not in RecycleSolver.METHODS:
+            raise ValueError(
+                f"method must be one of {', '.join(RecycleSolver.METHODS)}"
+            )
+        self.run = run
+        self.method = method
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.wegstein_bounds = wegstein_bounds
+
+    def solve(self) -> RecycleResult:
+        result = RecycleResult(converged=False, failed=False, iterations=0)
+        self.__previous = None
+        self.__inverse_jacobian = None
+        x = self.__read()
+        while result.iterations < self.max_iterations:
+            result.iterations += 1
+            if self.run() is False:
+                result.failed = True
+                return result
+            g = self.__read()
+            result.history.append(float(np.linalg.norm(g - x)))
+            if Stream.are_equal(g, x, self.tolerance):
+                result.converged = True
+                return result
+            x_next = np.maximum(self.__accelerate(x, g), 0.0)
+            self.__previous = (x, g)
+            self.__write(x_next)
+            x = x_next
+        return result
+
+    def __accelerate(self, x: np.ndarray, g: np.ndarray) -> np.ndarray:
+        if self.method == "substitution":
+            return g
+        if self.method == "wegstein":
+            if self.__previous is None:
+                return g
+            x_prev, g_prev = self.__previous
+            dx = x - x_prev
+            with np.errstate(divide="ignore", invalid="ignore"):
+                slope = np.where(dx != 0, (g - g_prev) / dx, 0.0)
+                q = np.where(slope != 1, slope / (slope - 1), 0.0)
+            q = np.clip(q, *self.wegstein_bounds)
+            return q * x + (1 - q) * g
+
+        residual = g - x
+        if self.__inverse_jacobian is None:
+            # -I makes the first step plain substitution
+            self.__inverse_jacobian = -np.eye(len(x))
+        else:
+            x_prev, g_prev = self.__previous
+            dx = x - x_prev
+            d_residual = residual - (g_prev - x_prev)
+            h_dr = self.__inverse_jacobian @ d_residual
+            denom = dx @ h_dr
+            if abs(denom) > 1e-300:
+                self.__inverse_jacobian += (
+                    np.outer(dx - h_dr, dx @ self.__inverse_jacobian) / denom
+                )
+        return x - self.__inverse_jacobian @ residual
+
+    def __read(self) -> np.ndarray:
+        return np.concatenate([stream.flows[:, 0] for stream in self.tears])
+
+    def __write(self, mass_flow: np.ndarray) -> None:
+        for stream, part in zip(self.tears, np.split(mass_flow, len(self.tears))):
+            with stream.bulk_update():
+                SPECIES.flows_from_mass(part, out=stream.flows)
@@ -0,0 +1,110 @@
+from typing import Dict, List, Tuple, Type
+
+import numpy as np
+
+from utils.Components import Component
+
+
+class SpeciesRegistry:
+    """
+    Property table shared by every Stream. Species are ordered by name so
+    array rows line up with the order streams have always been printed in.
+
+    molecular_weight in g/mol
+    density in kg/m^3 (nan for species without volume)
+    """
+
+    def __init__(self, component_classes: List[Type[Component]]) -> None:
+        self.classes: Tuple[Type[Component], ...] = tuple(
+            sorted(component_classes, key=lambda cls: cls.NAME)
+        )
+        self.names: Tuple[str, ...] = tuple(cls.NAME for cls in self.classes)
+        self.indices: Dict[str, int] = {
+            name: idx for idx, name in enumerate(self.names)
+        }
+        if len(self.indices) != len(self.names):
+            raise ValueError("Component names must be unique in the species registry")
+
+        self.molecular_weight = np.array(
+            [cls.MOLECULAR_WEIGHT for cls in self.classes], dtype=float
+        )
+        self.has_volume = np.array([cls.HAS_VOLUME for cls in self.classes])
+        self.density = np.array(
+            [np.nan if cls.DENSITY is None else cls.DENSITY for cls in self.classes],
+            dtype=float,
+        )
+        # inf for species without volume so that mass / volume_density is 0
+        self.volume_density = np.where(self.has_volume, self.density, np.inf)
+        for arr in (
+            self.molecular_weight,
+            self.has_volume,
+            self.density,
+            self.volume_density,
+        ):
+            arr.flags.writeable = False
+
+    @property
+    def size(self) -> int:
+        return len(self.names)
+
+    def index(self, component_name: str) -> int:
+        try:
+            return self.indices[component_name]
+        except KeyError:
+            raise ValueError(
+                f"Component {component_name} is not a registered species"
+            ) from None
+
+    def flow_row(
+        self, idx: int, flow_rate: float, flow_type: str = "mass"
+    ) -> Tuple[float, float, float]:
+        """
+        (mass_flow, mol_flow, vol_flow) of species idx, with the same arithmetic
+        as Component.update_flow
+        """
+        mw = self.classes[idx].MOLECULAR_WEIGHT
+        density = self.classes[idx].DENSITY
+        has_volume = self.classes[idx].HAS_VOLUME
+        if flow_type == "mass":
+            mass_flow = flow_rate
+            mol_flow = (mass_flow / mw) * 1000
+        elif flow_type == "molar":
+            mol_flow = flow_rate
+            mass_flow = mol_flow * mw / 1000
+        elif flow_type == "volume":
+            if not has_volume:
+                raise ValueError(
+                    f"Error in Component {self.names[idx]}: Volume flow cannot be set for a component without volume"
+                )
+            mass_flow = flow_rate * density
+            mol_flow = (mass_flow / mw) * 1000
+            return mass_flow, mol_flow, flow_rate
+        else:
+            raise ValueError("Invalid flow_type. Must be 'mass', 'molar', or 'volume'")
+        vol_flow = 0 if not has_volume else mass_flow / density
+        return mass_flow, mol_flow, vol_flow
+
+    def flows_from_mass(
+        self, mass_flow: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Stack (..., n_species) mass flows into (..., n_species, 3) flows, with the
+        same arithmetic as Component.set_mass_flow. mass_flow may be a view of
+        out[..., 0], in which case nothing is allocated.
+        """
+        mass_flow = np.asarray(mass_flow)
+        if out is None:
+            out = np.empty(mass_flow.shape + (3,), dtype=mass_flow.dtype)
+        if not np.shares_memory(mass_flow, out[..., 0]):
+            np.copyto(out[..., 0], mass_flow)
+        mol_flow = out[..., 1]
+        np.divide(out[..., 0], self.molecular_weight, out=mol_flow)
+        np.multiply(mol_flow, 1000, out=mol_flow)
+        np.divide(out[..., 0], self.volume_density, out=out[..., 2])
+        return out
+
+    def make_component(self, idx: int, row: np.ndarray) -> Component:
+        return self.classes[idx].from_state(float(row[0]), float(row[1]), float(row[2]))
+
+
+SPECIES = SpeciesRegistry(Component.__subclasses__())
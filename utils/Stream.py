@@ -1,11 +1,60 @@
 from __future__ import annotations
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
 from utils.Components import Component
+from utils.SpeciesRegistry import SPECIES
 import numpy as np
 
 
+class PropertyAccessor:
+    """
+    Species and property resolved once, read from any Stream in O(1) with
+    accessor(stream). Built through Stream.accessor.
+    """
+
+    __slots__ = ("component_name", "property_name", "_idx", "_column", "_fraction")
+
+    FRACTIONS: Dict[str, int] = {
+        "mass_fraction": 0,
+        "molar_fraction": 1,
+        "volume_fraction": 2,
+    }
+
+    def __init__(self, component_name: str, property_name: str) -> None:
+        if property_name in Stream.ATTRIBUTES:
+            self._column = Stream.ATTRIBUTES[property_name]
+            self._fraction = False
+        elif property_name in PropertyAccessor.FRACTIONS:
+            self._column = PropertyAccessor.FRACTIONS[property_name]
+            self._fraction = True
+        else:
+            raise ValueError(f"Property {property_name} not a valid query")
+        self._idx = SPECIES.index(component_name)
+        self.component_name = component_name
+        self.property_name = property_name
+
+    def __call__(self, stream: Stream) -> float:
+        if not stream.present[self._idx]:
+            raise ValueError(
+                f"Component {self.component_name} not found in stream {stream.stream_number}"
+            )
+        value = stream.flows.item(self._idx, self._column)
+        if not self._fraction:
+            return value
+        stream._refresh()
+        total = stream._totals.item(self._column)
+        # components without volume never count towards the volume fraction
+        if total > 0 and (self._column != 2 or SPECIES.has_volume[self._idx]):
+            return value / total
+        return 0
+
+    def __repr__(self) -> str:
+        return f"PropertyAccessor({self.component_name!r}, {self.property_name!r})"
+
+
 class Stream:
     ATTRIBUTES: Dict[str, int] = {"mass_flow": 0, "molar_flow": 1, "volume_flow": 2}
+    _ACCESSORS: Dict[Tuple[str, str], PropertyAccessor] = {}
 
     def __init__(
         self,
@@ -18,98 +67,245 @@ class Stream:
         self.stream_number = stream_number
         self.origin = origin
         self.destination = destination
-        self.components: List[Component] = sorted(components, key=lambda x: x.name)
-        self.component_indices: Dict[str, int] = {
-            component.name: idx for idx, component in enumerate(self.components)
-        }
         self.recycle = recycle
-        self.total_mass: float = 0.0
-        self.total_molar_flow: float = 0.0
-        self.total_volume: float = 0.0
-        self._update_totals_and_state_vector()
+        # one row per registered species : [mass_flow, mol_flow, vol_flow]
+        self.flows: np.ndarray = np.zeros((SPECIES.size, 3))
+        # species that are part of the stream, even at zero flow
+        self.present: np.ndarray = np.zeros(SPECIES.size, dtype=bool)
+        # totals and state vector are computed on first read after a change
+        self._dirty: bool = True
+        self._totals: np.ndarray = np.zeros(3)
+        self._total_mass: float = 0.0
+        self._total_molar_flow: float = 0.0
+        self._total_volume: float = 0.0
+        self._density: Optional[float] = None
+        self._state_vector: np.ndarray = None
+        self.update_components(components)
 
-    def _create_state_vector(self) -> List[List[float]]:
+    @property
+    def components(self) -> List[Component]:
         return [
-            [component.mass_flow, component.mol_flow, component.vol_flow]
-            for component in self.components
+            SPECIES.make_component(idx, self.flows[idx])
+            for idx in np.flatnonzero(self.present)
         ]
 
-    def _update_totals_and_state_vector(self) -> None:
-        """Recalculate total mass, molar flow, and volume, and update the state vector."""
-        self.total_mass = sum(component.mass_flow for component in self.components)
-        self.total_molar_flow = sum(component.mol_flow for component in self.components)
-        self.total_volume = sum(
-            component.vol_flow for component in self.components if component.has_volume
+    @property
+    def component_indices(self) -> Dict[str, int]:
+        return {
+            SPECIES.names[idx]: pos
+            for pos, idx in enumerate(np.flatnonzero(self.present))
+        }
+
+    @property
+    def state_vector(self) -> np.ndarray:
+        self._refresh()
+        return self._state_vector
+
+    @property
+    def total_mass(self) -> float:
+        self._refresh()
+        return self._total_mass
+
+    @property
+    def total_molar_flow(self) -> float:
+        self._refresh()
+        return self._total_molar_flow
+
+    @property
+    def total_volume(self) -> float:
+        self._refresh()
+        return self._total_volume
+
+    @property
+    def density(self) -> Optional[float]:
+        self._refresh()
+        return self._density
+
+    def mark_dirty(self) -> None:
+        """Invalidate the cached totals, needed after writing to flows directly"""
+        self._dirty = True
+
+    def _refresh(self) -> None:
+        """Recalculate total mass, molar flow, volume and the state vector if flows changed."""
+        if not self._dirty:
+            return
+        # reducing over the species axis adds rows in registry order
+        self.flows.sum(axis=0, out=self._totals)
+        self._total_mass, self._total_molar_flow, self._total_volume = (
+            self._totals.tolist()
         )
-        self.state_vector = self._create_state_vector()
-        self.density = (
-            self.total_mass / self.total_volume if self.total_volume != 0 else None
+        self._density = (
+            self._total_mass / self._total_volume if self._total_volume != 0 else None
         )
+        self._state_vector = self.flows[self.present]
+        self._dirty = False
+
+    @contextmanager
+    def bulk_update(self, reset: bool = False) -> Iterator[Stream]:
+        """
+        Group several writes (set_component_flow or in place writes to flows)
+        and invalidate the totals once on exit. reset empties the stream first.
+        """
+        if reset:
+            self.flows[:] = 0.0
+            self.present[:] = False
+        try:
+            yield self
+        finally:
+            self._dirty = True
 
     def update_components(self, new_components: List[Component]) -> None:
-        self.components = sorted(new_components, key=lambda x: x.name)
-        self.component_indices = {
-            component.name: idx for idx, component in enumerate(self.components)
-        }
-        self._update_totals_and_state_vector()
+        self.flows[:] = 0.0
+        self.present[:] = False
+        for component in new_components:
+            idx = SPECIES.index(component.name)
+            self.flows[idx] = (
+                component.mass_flow,
+                component.mol_flow,
+                component.vol_flow,
+            )
+            self.present[idx] = True
+        self._dirty = True
+
+    def set_component_flow(
+        self, component_name: str, flow_rate: float, flow_type: str = "mass"
+    ) -> None:
+        """Write one species row in place, flow_type mass, molar or volume"""
+        idx = SPECIES.index(component_name)
+        self.flows[idx] = SPECIES.flow_row(idx, flow_rate, flow_type)
+        self.present[idx] = True
+        self._dirty = True
+
+    def copy_from(self, other: Stream) -> Stream:
+        """Overwrite this stream's composition with other's, keeping its identity"""
+        if other is not self:
+            np.copyto(self.flows, other.flows)
+            np.copyto(self.present, other.present)
+            self._dirty = True
+        return self
+
+    def clone(
+        self,
+        stream_number: int = None,
+        origin: str = None,
+        destination: str = None,
+    ) -> Stream:
+        """Independent copy of the stream, optionally renumbered or rerouted"""
+        clone = Stream(
+            self.stream_number if stream_number is None else stream_number,
+            self.origin if origin is None else origin,
+            self.destination if destination is None else destination,
+            recycle=self.recycle,
+        )
+        return clone.copy_from(self)
+
+    def derive(
+        self, out: Stream, overrides: Dict[str, float], flow_type: str = "mass"
+    ) -> Stream:
+        """
+        Write this stream's composition into out with the flows of the species in
+        overrides replaced (or added), e.g. an outlet that only differs from its
+        inlet by the UO2SO4 it picked up
+        """
+        out.copy_from(self)
+        for component_name, flow_rate in overrides.items():
+            out.set_component_flow(component_name, flow_rate, flow_type)
+        return out
+
+    def fractions(self, property_name: str = "mass_flow") -> np.ndarray:
+        """Fraction of each registered species on a mass_flow, molar_flow or volume_flow basis"""
+        if property_name not in Stream.ATTRIBUTES:
+            raise ValueError(f"Property {property_name} not a valid basis")
+        column = self.flows[:, Stream.ATTRIBUTES[property_name]]
+        total = column.sum()
+        if total <= 0:
+            return np.zeros(SPECIES.size)
+        return column / total
+
+    @staticmethod
+    def accessor(component_name: str, property_name: str) -> PropertyAccessor:
+        """Shared handle for one (component, property) pair, see PropertyAccessor"""
+        key = (component_name, property_name)
+        handle = Stream._ACCESSORS.get(key)
+        if handle is None:
+            handle = PropertyAccessor(component_name, property_name)
+            Stream._ACCESSORS[key] = handle
+        return handle
 
     def get_component_property(self, component_name: str, property_name: str) -> float:
-        """mass_flow, molar_flow, volume_flow, mass_fraction, molar_fraction"""
-        if component_name not in self.component_indices.keys():
+        """mass_flow, molar_flow, volume_flow, mass_fraction, molar_fraction, volume_fraction"""
+        handle = Stream._ACCESSORS.get((component_name, property_name))
+        if handle is None:
+            if component_name not in SPECIES.indices:
+                raise ValueError(
+                    f"Component {component_name} not found in stream {self.stream_number}"
+                )
+            handle = Stream.accessor(component_name, property_name)
+        return handle(self)
+
+    def query(
+        self, component_names: Sequence[str], property_names: Sequence[str]
+    ) -> np.ndarray:
+        """
+        Bulk get_component_property, returns an array of shape
+        (len(component_names), len(property_names))
+        """
+        handles = [
+            [Stream.accessor(c, p) for p in property_names] for c in component_names
+        ]
+        idx = np.array([row[0]._idx for row in handles], dtype=int)
+        missing = ~self.present[idx]
+        if missing.any():
             raise ValueError(
-                f"Component {component_name} not found in stream {self.stream_number}"
+                f"Component {component_names[int(np.argmax(missing))]} not found in stream {self.stream_number}"
             )
 
-        component_idx = self.component_indices[component_name]
-        component = self.components[component_idx]
-
-        if property_name == "mass_flow":
-            return component.mass_flow
-        elif property_name == "molar_flow":
-            return component.mol_flow
-        elif property_name == "volume_flow":
-            return component.vol_flow
-        elif property_name == "mass_fraction":
-            return component.mass_flow / self.total_mass if self.total_mass > 0 else 0
-        elif property_name == "molar_fraction":
-            return (
-                component.mol_flow / self.total_molar_flow
-                if self.total_molar_flow > 0
-                else 0
-            )
-        elif property_name == "volume_fraction":
-            return (
-                component.vol_flow / self.total_volume
-                if self.total_volume > 0 and component.has_volume
-                else 0
-            )
-        else:
-            raise ValueError(f"Property {property_name} not a valid query")
+        self._refresh()
+        columns = np.array([handle._column for handle in handles[0]], dtype=int)
+        fraction = np.array([handle._fraction for handle in handles[0]])
+        values = self.flows[np.ix_(idx, columns)]
+        if fraction.any():
+            totals = self._totals[columns]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fractions = np.where(totals > 0, values / totals, 0.0)
+            fractions[:, columns == 2] *= SPECIES.has_volume[idx][:, None]
+            values = np.where(fraction, fractions, values)
+        return values
 
     @staticmethod
     def combine_streams(streams: List[Stream]) -> List[Component]:
-        combined_data = {}
-
+        present = np.zeros(SPECIES.size, dtype=bool)
+        total_mass = np.zeros(SPECIES.size)
         for stream in streams:
-            for component in stream.components:
-                if component.name not in combined_data:
-                    combined_data[component.name] = {
-                        "total_mass": 0,
-                        "class": type(
-                            component
-                        ),  # Store the class of the component for instantiation
-                    }
-                combined_data[component.name]["total_mass"] += component.mass_flow
+            present |= stream.present
+            total_mass += stream.flows[:, 0]
 
         # Creating new component instances with combined mass flows
-        combined_components = []
-        for name, data in combined_data.items():
-            # Instantiate the correct component class with combined mass flow
-            combined_components.append(
-                data["class"](flow_rate=data["total_mass"], flow_type="mass")
-            )
+        return [
+            SPECIES.classes[idx](flow_rate=float(total_mass[idx]), flow_type="mass")
+            for idx in np.flatnonzero(present)
+        ]
+
+    @staticmethod
+    def mix(streams: List[Stream], out: Stream) -> Stream:
+        """
+        Mass-wise sum of the inlet streams written into the preallocated out
+        stream, with molar and volume flows rebuilt from the mass exactly like
+        combine_streams. Species missing from an inlet contribute a zero row.
+        """
+        if any(stream is out for stream in streams):
+            raise ValueError("The outlet of a mix cannot also be one of its inlets")
+
+        mass_flow = out.flows[:, 0]
+        np.copyto(mass_flow, streams[0].flows[:, 0])
+        np.copyto(out.present, streams[0].present)
+        for stream in streams[1:]:
+            np.add(mass_flow, stream.flows[:, 0], out=mass_flow)
+            np.logical_or(out.present, stream.present, out=out.present)
 
-        return combined_components
+        SPECIES.flows_from_mass(mass_flow, out=out.flows)
+        out.mark_dirty()
+        return out
 
     @staticmethod
     def are_equal(vec1: np.ndarray, vec2: np.ndarray, tolerance=1e-4) -> bool:
@@ -120,11 +316,199 @@ class Stream:
     def __repr__(self) -> str:
         component_details: str = "\n".join(
             [
-                f"{idx}: {comp.name} - Mass flow: {vec[0]:.6f} kg/h, "
+                f"{pos}: {SPECIES.names[idx]} - Mass flow: {vec[0]:.6f} kg/h, "
                 f"Molar flow: {vec[1]:.6f} mol/h, Volume flow: {vec[2]:.6f} m^3/h"
-                for idx, (comp, vec) in enumerate(
-                    zip(self.components, self.state_vector)
+                for pos, (idx, vec) in enumerate(
+                    zip(np.flatnonzero(self.present), self.state_vector)
                 )
             ]
         )
         return f"Stream {self.stream_number} from {self.origin} to {self.destination}:\n{component_details}"
+
+
+class StreamBatch:
+    """
+    N independent states of one stream, held as a (N, n_species, 3) block in
+    species registry order. float64 by default, float32 for very large batches.
+    """
+
+    ATTRIBUTES: Dict[str, int] = Stream.ATTRIBUTES
+
+    def __init__(
+        self,
+        stream_number: int,
+        origin: str,
+        destination: str,
+        size: int,
+        dtype: np.dtype = np.float64,
+        recycle: bool = False,
+    ) -> None:
+        if np.dtype(dtype) not in (np.dtype(np.float64), np.dtype(np.float32)):
+            raise ValueError("StreamBatch dtype must be float64 or float32")
+        self.stream_number = stream_number
+        self.origin = origin
+        self.destination = destination
+        self.recycle = recycle
+        self.flows: np.ndarray = np.zeros((size, SPECIES.size, 3), dtype=dtype)
+        self.present: np.ndarray = np.zeros(SPECIES.size, dtype=bool)
+
+    @classmethod
+    def from_stream(
+        cls, stream: Stream, size: int, dtype: np.dtype = np.float64
+    ) -> StreamBatch:
+        """N copies of a single stream state"""
+        batch = cls(
+            stream.stream_number,
+            stream.origin,
+            stream.destination,
+            size,
+            dtype=dtype,
+            recycle=stream.recycle,
+        )
+        batch.flows[:] = stream.flows
+        batch.present[:] = stream.present
+        return batch
+
+    @classmethod
+    def from_streams(
+        cls, streams: List[Stream], dtype: np.dtype = np.float64
+    ) -> StreamBatch:
+        """Stack states of the same stream, e.g. one per design point"""
+        first = streams[0]
+        batch = cls(
+            first.stream_number,
+            first.origin,
+            first.destination,
+            len(streams),
+            dtype=dtype,
+            recycle=first.recycle,
+        )
+        for row, stream in enumerate(streams):
+            batch.flows[row] = stream.flows
+            batch.present |= stream.present
+        return batch
+
+    def __len__(self) -> int:
+        return self.flows.shape[0]
+
+    def to_stream(self, row: int) -> Stream:
+        stream = Stream(
+            self.stream_number, self.origin, self.destination, recycle=self.recycle
+        )
+        stream.flows[:] = self.flows[row]
+        stream.present[:] = self.present
+        stream.mark_dirty()
+        return stream
+
+    def update_flows(self, flows: np.ndarray, present: np.ndarray = None) -> None:
+        """Overwrite the whole block, flows broadcast to (N, n_species, 3)"""
+        self.flows[:] = flows
+        if present is None:
+            present = np.any(self.flows != 0, axis=(0, 2))
+        self.present[:] = present
+
+    def set_component_flow(
+        self, component_name: str, flow_rate: np.ndarray, flow_type: str = "mass"
+    ) -> None:
+        """flow_rate is a scalar or a length-N array, flow_type mass, molar or volume"""
+        idx = SPECIES.index(component_name)
+        flow_rate = np.asarray(flow_rate, dtype=self.flows.dtype)
+        mass_flow, mol_flow, vol_flow = SPECIES.flow_row(idx, flow_rate, flow_type)
+        self.flows[:, idx, 0] = mass_flow
+        self.flows[:, idx, 1] = mol_flow
+        self.flows[:, idx, 2] = vol_flow
+        self.present[idx] = True
+
+    @property
+    def total_mass(self) -> np.ndarray:
+        return self.flows[:, :, 0].sum(axis=1)
+
+    @property
+    def total_molar_flow(self) -> np.ndarray:
+        return self.flows[:, :, 1].sum(axis=1)
+
+    @property
+    def total_volume(self) -> np.ndarray:
+        return self.flows[:, :, 2].sum(axis=1)
+
+    @property
+    def density(self) -> np.ndarray:
+        """nan where a scenario has no volume"""
+        total_volume = self.total_volume
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total_volume != 0, self.total_mass / total_volume, np.nan)
+
+    def get_component_property(
+        self, component_name: str, property_name: str
+    ) -> np.ndarray:
+        """Length-N array of mass_flow, molar_flow, volume_flow, mass_fraction, molar_fraction or volume_fraction"""
+        idx = SPECIES.indices.get(component_name)
+        if idx is None or not self.present[idx]:
+            raise ValueError(
+                f"Component {component_name} not found in stream {self.stream_number}"
+            )
+
+        if property_name in StreamBatch.ATTRIBUTES:
+            return self.flows[:, idx, StreamBatch.ATTRIBUTES[property_name]].copy()
+        elif property_name == "mass_fraction":
+            column, total = self.flows[:, idx, 0], self.total_mass
+        elif property_name == "molar_fraction":
+            column, total = self.flows[:, idx, 1], self.total_molar_flow
+        elif property_name == "volume_fraction":
+            if not SPECIES.has_volume[idx]:
+                return np.zeros(len(self), dtype=self.flows.dtype)
+            column, total = self.flows[:, idx, 2], self.total_volume
+        else:
+            raise ValueError(f"Property {property_name} not a valid query")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(total > 0, column / total, 0).astype(self.flows.dtype)
+
+    @staticmethod
+    def combine_streams(batches: List[StreamBatch]) -> np.ndarray:
+        """
+        Mass-wise sum of aligned batches, returned as a (N, n_species, 3) block with
+        molar and volume flows rebuilt from the mass, like Stream.combine_streams
+        """
+        total_mass = batches[0].flows[:, :, 0].copy()
+        for batch in batches[1:]:
+            if len(batch) != len(batches[0]):
+                raise ValueError(
+                    "Batches must hold the same number of scenarios to combine"
+                )
+            total_mass += batch.flows[:, :, 0]
+        return SPECIES.flows_from_mass(total_mass)
+
+    @staticmethod
+    def combined_presence(batches: List[StreamBatch]) -> np.ndarray:
+        present = np.zeros(SPECIES.size, dtype=bool)
+        for batch in batches:
+            present |= batch.present
+        return present
+
+    @staticmethod
+    def mix(batches: List[StreamBatch], out: StreamBatch) -> StreamBatch:
+        """Batched Stream.mix, written into the preallocated out batch"""
+        if any(batch is out for batch in batches):
+            raise ValueError("The outlet of a mix cannot also be one of its inlets")
+        if any(len(batch) != len(out) for batch in batches):
+            raise ValueError(
+                "Batches must hold the same number of scenarios to combine"
+            )
+
+        mass_flow = out.flows[:, :, 0]
+        np.copyto(mass_flow, batches[0].flows[:, :, 0])
+        np.copyto(out.present, batches[0].present)
+        for batch in batches[1:]:
+            np.add(mass_flow, batch.flows[:, :, 0], out=mass_flow)
+            np.logical_or(out.present, batch.present, out=out.present)
+
+        SPECIES.flows_from_mass(mass_flow, out=out.flows)
+        return out
+
+    def __repr__(self) -> str:
+        names = ", ".join(SPECIES.names[idx] for idx in np.flatnonzero(self.present))
+        return (
+            f"StreamBatch {self.stream_number} from {self.origin} to {self.destination}: "
+            f"{len(self)} scenarios of [{names}] ({self.flows.dtype})"
+        )
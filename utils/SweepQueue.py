@@ -0,0 +1,214 @@
+import json
+import os
+import socket
+import time
+from typing import Iterator, List, Optional, Tuple
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parse "i/N" into (i, N), shards are numbered 1 to N"""
+    try:
+        index, count = (int(part) for part in shard.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, not {shard}") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard {shard} is not between 1/{count} and {count}/{count}")
+    return index, count
+
+
+def shard_indices(num_points: int, index: int, count: int) -> range:
+    """Grid indices of shard index of count, every count-th point"""
+    return range(index - 1, num_points, count)
+
+
+class SweepQueue:
+    """
+    Work queue of a sweep in a directory every worker can reach, e.g. over
+    NFS, without a broker. The grid is cut into chunks of consecutive grid
+    indices. A worker claims chunk k by creating chunk-k.lock with O_EXCL,
+    which only one worker can do, and creates chunk-k.done once the chunk's
+    results are on disk. Each worker writes its own results file, merged
+    afterwards with SweepStore.merge.
+
+    With stale_after (seconds), a lock without a done marker older than that
+    is taken to be from a dead worker and the chunk is claimed again. It has
+    to be longer than any chunk takes. A worker that runs out of chunks then
+    keeps polling the unfinished ones, so a chunk whose lock goes stale after
+    every worker has passed it is still picked up.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        num_points: int,
+        chunk_size: int = 64,
+        stale_after: float = None,
+        grid: str = None,
+    ) -> None:
+        """grid identifies the grid's axis values, e.g. SweepRunner.grid_fingerprint"""
+        self.directory = directory
+        self.stale_after = stale_after
+        os.makedirs(directory, exist_ok=True)
+        self.num_points, self.chunk_size = self.__agree_on_grid(
+            num_points, chunk_size, grid
+        )
+        self.num_chunks = -(-self.num_points // self.chunk_size)
+        self.worker = f"{socket.gethostname()}-{os.getpid()}"
+        self.__next = 0
+
+    def __agree_on_grid(
+        self, num_points: int, chunk_size: int, grid: Optional[str]
+    ) -> Tuple[int, int]:
+        """The first worker records the grid, later ones must match it"""
+        path = os.path.join(self.directory, "grid.json")
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # the creator may still be writing it
+            for _ in range(50):
+                with open(path, "r") as fp:
+                    text = fp.read()
+                if text:
+                    break
+                time.sleep(0.1)
+            else:
+                raise ValueError(
+                    f"{path} is still empty after 5 s, remove it if the worker that created it died"
+                )
+            recorded = json.loads(text)
+            if recorded["num_points"] != num_points or recorded.get("grid") != grid:
+                raise ValueError(
+                    f"Queue {self.directory} is for a different grid, "
+                    f"{recorded['num_points']} points with axes {recorded.get('grid')}, "
+                    f"not {num_points} points with axes {grid}"
+                )
+            return recorded["num_points"], recorded["chunk_size"]
+        with os.fdopen(fd, "w") as fp:
+            json.dump(
+                {"num_points": num_points, "chunk_size": chunk_size, "grid": grid}, fp
+            )
+        return num_points, chunk_size
+
+    def __path(self, chunk: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"chunk-{chunk:06d}.{suffix}")
+
+    @property
+    def output(self) -> str:
+        """This worker's results file"""
+        return os.path.join(self.directory, f"results-{self.worker}.jsonl")
+
+    def result_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("results-") and name.endswith(".jsonl")
+        )
+
+    def claim(self) -> Optional[int]:
+        """
+        Next chunk nobody has claimed, None once all are claimed, or with
+        stale_after once all are done
+        """
+        chunk = self.__claim_next()
+        if chunk is not None or self.stale_after is None:
+            return chunk
+        poll = min(max(self.stale_after / 4, 0.1), 10.0)
+        while True:
+            unfinished = [
+                chunk
+                for chunk in range(self.num_chunks)
+                if not os.path.exists(self.__path(chunk, "done"))
+            ]
+            if not unfinished:
+                return None
+            for chunk in unfinished:
+                if self.__is_stale(chunk):
+                    self.__break_lock(chunk)
+                    if self.__try_lock(chunk):
+                        return chunk
+            time.sleep(poll)
+
+    def __claim_next(self) -> Optional[int]:
+        """First pass over the chunks, in order"""
+        while self.__next < self.num_chunks:
+            chunk = self.__next
+            self.__next += 1
+            if os.path.exists(self.__path(chunk, "done")):
+                continue
+            if self.__try_lock(chunk):
+                return chunk
+            if self.__is_stale(chunk):
+                self.__break_lock(chunk)
+                if self.__try_lock(chunk):
+                    return chunk
+        return None
+
+    def __try_lock(self, chunk: int) -> bool:
+        try:
+            fd = os.open(
+                self.__path(chunk, "lock"), os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as fp:
+            fp.write(self.worker)
+        return True
+
+    def __is_stale(self, chunk: int) -> bool:
+        if self.stale_after is None:
+            return False
+        try:
+            age = time.time() - os.path.getmtime(self.__path(chunk, "lock"))
+        except FileNotFoundError:
+            return True
+        return age > self.stale_after and not os.path.exists(self.__path(chunk, "done"))
+
+    def __break_lock(self, chunk: int) -> None:
+        """Remove a stale lock, renamed first so only one worker breaks it"""
+        broken = self.__path(chunk, f"stale-{self.worker}")
+        try:
+            os.rename(self.__path(chunk, "lock"), broken)
+        except FileNotFoundError:
+            # already broken by another worker, who may hold it again by now
+            return
+        os.remove(broken)
+
+    def complete(self, chunk: int) -> None:
+        """Mark chunk done, its results must be flushed to disk before"""
+        with open(self.__path(chunk, "done"), "w") as fp:
+            fp.write(self.worker)
+
+    def chunk_range(self, chunk: int) -> range:
+        start = chunk * self.chunk_size
+        return range(start, min(start + self.chunk_size, self.num_points))
+
+    def chunk_of(self, index: int) -> int:
+        return index // self.chunk_size
+
+    def is_chunk_end(self, index: int) -> bool:
+        return index == self.chunk_range(self.chunk_of(index)).stop - 1
+
+    def indices(self) -> Iterator[int]:
+        """Grid indices of the chunks this worker claims, claimed as consumed"""
+        while (chunk := self.claim()) is not None:
+            yield from self.chunk_range(chunk)
+
+    def claim_merge(self) -> bool:
+        """True for the one worker that gets to merge the results"""
+        try:
+            os.close(
+                os.open(
+                    os.path.join(self.directory, "merge.lock"),
+                    os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                )
+            )
+        except FileExistsError:
+            return False
+        return True
+
+    def remaining(self) -> int:
+        """Chunks without a done marker"""
+        return sum(
+            not os.path.exists(self.__path(chunk, "done"))
+            for chunk in range(self.num_chunks)
+        )
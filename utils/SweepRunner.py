@@ -0,0 +1,153 @@
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from models.IsothermModeling import (
+    IsothermModel,
+    EXTRACTION_ISOTHERM,
+    STRIPPING_ISOTHERM,
+)
+
+
+def iter_grid(**axes: Sequence) -> Iterator[Dict[str, Any]]:
+    """
+    Every combination of the axes as keyword dicts, the last axis varying
+    fastest, i.e. the order of nested for loops over the axes as given
+    """
+    names = list(axes)
+    for values in itertools.product(*axes.values()):
+        yield dict(zip(names, values))
+
+
+def grid_size(**axes: Sequence) -> int:
+    return math.prod(len(axis) for axis in axes.values())
+
+
+def grid_fingerprint(**axes: Sequence) -> str:
+    """Hash of the axis names and values, equal only for the same grid"""
+    spec = [
+        [name, [value.item() if hasattr(value, "item") else value for value in axis]]
+        for name, axis in axes.items()
+    ]
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()
+
+
+def grid_point(index: int, **axes: Sequence) -> Dict[str, Any]:
+    """Point index of iter_grid(**axes), without walking the grid"""
+    positions = np.unravel_index(index, [len(axis) for axis in axes.values()])
+    return {
+        name: axis[int(position)]
+        for (name, axis), position in zip(axes.items(), positions)
+    }
+
+
+def parameter_grid(**axes: Sequence) -> List[Dict[str, Any]]:
+    return list(iter_grid(**axes))
+
+
+def load_isotherms(specs: List[Dict] = None) -> None:
+    """Worker initializer, fits the shared isotherm models once per process"""
+    IsothermModel.preload(
+        [EXTRACTION_ISOTHERM, STRIPPING_ISOTHERM] if specs is None else specs
+    )
+
+
+def _evaluate(function: Callable[..., Any], point: Dict[str, Any]) -> Any:
+    return function(**point)
+
+
+class SweepRunner:
+    """
+    Evaluates function(**point) over a parameter grid, serially or on a pool of
+    worker processes. Points are sent to the workers in chunks and results come
+    back in grid order whatever the number of workers, so a parallel sweep
+    gives the same output as a serial one.
+
+    backend process uses concurrent.futures.ProcessPoolExecutor, backend
+    multiprocessing a multiprocessing.Pool. function must be importable by the
+    workers, i.e. defined at module level of a module that can be imported
+    without side effects.
+    """
+
+    BACKENDS = ("process", "multiprocessing")
+    DEFAULT_CHUNKSIZE = 64
+
+    def __init__(
+        self,
+        function: Callable[..., Any],
+        workers: int = 1,
+        backend: str = "process",
+        chunksize: int = None,
+        initializer: Callable = load_isotherms,
+        initargs: Tuple = (),
+    ) -> None:
+        if backend not in SweepRunner.BACKENDS:
+            raise ValueError(
+                f"backend must be one of {', '.join(SweepRunner.BACKENDS)}"
+            )
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.function = function
+        self.workers = workers
+        self.backend = backend
+        self.chunksize = chunksize
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def chunksize_for(self, num_points: int = None) -> int:
+        """About four chunks per worker, few enough round trips, still balanced"""
+        if self.chunksize is not None:
+            return self.chunksize
+        if num_points is None:
+            return SweepRunner.DEFAULT_CHUNKSIZE
+        return max(
+            1,
+            min(
+                SweepRunner.DEFAULT_CHUNKSIZE,
+                math.ceil(num_points / (4 * self.workers)),
+            ),
+        )
+
+    def imap(
+        self, points: Iterable[Dict[str, Any]], num_points: int = None
+    ) -> Iterator[Any]:
+        """
+        Results one at a time in the order of points. points is consumed lazily,
+        a window of a few chunks per worker at a time, so it can be a generator
+        over a grid too large to list. num_points, if known, sizes the chunks.
+        """
+        task = partial(_evaluate, self.function)
+        if self.workers == 1:
+            if self.initializer is not None:
+                self.initializer(*self.initargs)
+            yield from map(task, points)
+            return
+
+        chunksize = self.chunksize_for(num_points)
+        window = chunksize * self.workers * 4
+        points = iter(points)
+        if self.backend == "process":
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=self.initializer,
+                initargs=self.initargs,
+            ) as executor:
+                while batch := list(itertools.islice(points, window)):
+                    yield from executor.map(task, batch, chunksize=chunksize)
+        else:
+            with multiprocessing.Pool(
+                self.workers, initializer=self.initializer, initargs=self.initargs
+            ) as pool:
+                while batch := list(itertools.islice(points, window)):
+                    yield from pool.imap(task, batch, chunksize=chunksize)
+
+    def run(self, points: Iterable[Dict[str, Any]]) -> List[Any]:
+        points = list(points)
+        return list(self.imap(points, len(points)))
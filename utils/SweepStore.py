@@ -0,0 +1,158 @@
+import json
+import os
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+
+
+def run_id(grid_index: int) -> int:
+    """Run ID of the point at grid_index, 1 based like the sweep's run counter"""
+    return grid_index + 1
+
+
+class SweepStore:
+    """
+    Sweep results streamed to a JSON lines file, one {"run": id, "result": ...}
+    per evaluated point, infeasible ones included. Lines are buffered and
+    appended batch_size at a time, then flushed to disk, so a killed sweep
+    loses at most one batch and memory does not grow with the grid.
+
+    With resume, the existing file is kept and completed() tells which runs
+    to skip. A line torn by a crash mid-write is cut off first.
+    """
+
+    def __init__(
+        self, path: str, num_points: int, resume: bool = False, batch_size: int = 100
+    ) -> None:
+        self.path = path
+        self.num_points = num_points
+        self.batch_size = batch_size
+        self.__buffer: List[str] = []
+        self.__done = np.zeros(num_points, dtype=bool)
+        if resume and os.path.exists(path):
+            SweepStore.__drop_torn_line(path)
+            for run, _ in SweepStore.scan(path):
+                if 1 <= run <= num_points:
+                    self.__done[run - 1] = True
+            self.__fp = open(path, "a")
+        else:
+            self.__fp = open(path, "w")
+
+    def completed(self) -> np.ndarray:
+        """Boolean mask over grid indices of the runs already stored"""
+        return self.__done
+
+    def append(self, run: int, result: Any) -> None:
+        self.__buffer.append(json.dumps({"run": run, "result": result}) + "\n")
+        self.__done[run - 1] = True
+        if len(self.__buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.__buffer:
+            return
+        self.__fp.write("".join(self.__buffer))
+        self.__fp.flush()
+        os.fsync(self.__fp.fileno())
+        self.__buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.__fp.close()
+
+    def __enter__(self) -> "SweepStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def scan(path: str):
+        """(run, byte offset of its line) for every complete line of path"""
+        with open(path, "rb") as fp:
+            offset = 0
+            for line in fp:
+                if line.endswith(b"\n"):
+                    yield json.loads(line)["run"], offset
+                offset += len(line)
+
+    @staticmethod
+    def __locate(paths: List[str], num_points: int) -> np.ndarray:
+        """(file, byte offset) of each run's line, the last one wins, -1 if missing"""
+        location = np.full((num_points, 2), -1, dtype=np.int64)
+        for file_index, path in enumerate(paths):
+            for run, offset in SweepStore.scan(path):
+                if 1 <= run <= num_points:
+                    location[run - 1] = (file_index, offset)
+        return location
+
+    @staticmethod
+    def __lines(paths: List[str], num_points: int) -> Iterator[Tuple[int, bytes]]:
+        """(grid index, line) of every stored run in run order, each run once"""
+        location = SweepStore.__locate(paths, num_points)
+        handles = [open(path, "rb") for path in paths]
+        try:
+            for index in np.flatnonzero(location[:, 0] >= 0):
+                file_index, offset = location[index]
+                handles[file_index].seek(offset)
+                yield int(index), handles[file_index].readline()
+        finally:
+            for handle in handles:
+                handle.close()
+
+    @staticmethod
+    def merge(paths: List[str], out_path: str, num_points: int) -> int:
+        """
+        Combine the results files of shards or queue workers into one, in run
+        order and with every run once. Only byte offsets are held in memory.
+        Returns the number of runs missing from all of them.
+        """
+        written = 0
+        with open(out_path, "wb") as out:
+            for _, line in SweepStore.__lines(paths, num_points):
+                out.write(line)
+                written += 1
+        return num_points - written
+
+    @staticmethod
+    def export(paths: List[str], out_path: str, num_points: int) -> int:
+        """
+        Write the feasible results of one or more stores to out_path as a
+        single JSON object keyed by run, in run order and with every run once
+        (the last line wins). Returns the number of runs written.
+        """
+        written = 0
+        with open(out_path, "w") as out:
+            out.write("{")
+            for index, line in SweepStore.__lines(paths, num_points):
+                result = json.loads(line)["result"]
+                if not isinstance(result, dict):
+                    continue
+                if written:
+                    out.write(", ")
+                out.write(f'"{run_id(index)}": {json.dumps(result)}')
+                written += 1
+            out.write("}")
+        return written
+
+    @staticmethod
+    def __drop_torn_line(path: str) -> None:
+        with open(path, "rb+") as fp:
+            data_end = fp.seek(0, os.SEEK_END)
+            if data_end == 0:
+                return
+            # walk back to the last newline, everything after it is torn
+            position = data_end
+            while position > 0:
+                step = min(4096, position)
+                fp.seek(position - step)
+                block = fp.read(step)
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    cut = position - step + newline + 1
+                    break
+                position -= step
+            else:
+                cut = 0
+            if cut != data_end:
+                fp.truncate(cut)
@@ -1,8 +1,6 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-
-
 def generate_process_graph(units, streams):
+    import networkx as nx
+
     G = nx.MultiDiGraph()
 
     for partition_index, unit_group in enumerate(units):
@@ -18,6 +16,9 @@ def generate_process_graph(units, streams):
 
 
 def draw_process_graph(G):
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
     pos = nx.multipartite_layout(G, subset_key="partition")
 
     plt.figure(figsize=(12, 8), facecolor="white")